@@ -0,0 +1,379 @@
+"""Benchmarks for the code that runs on every message during a game of 24.
+
+Runs offline, without a Discord connection, from the repository root:
+
+    python benchmarks/game24.py                 # run and print a report
+    python benchmarks/game24.py --save          # also store it as the baseline
+    python benchmarks/game24.py --compare       # fail on regressions
+    python benchmarks/game24.py -k eval_check   # only matching benchmarks
+
+Inputs are generated from a fixed seed so runs are comparable. Each benchmark
+times single calls and reports throughput plus median, p99 and worst latency.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from itertools import permutations
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from unity.cogs.game24 import PUZZLES_PATH, Game24  # noqa: E402
+from unity.util.game24 import (  # noqa: E402
+    MAX_DEPTH,
+    PRECEDENCE,
+    evaluate,
+    load_solution_table,
+    tokenize,
+)
+from unity.util.puzzles import LEVELS  # noqa: E402
+from unity.util.solver import Solver  # noqa: E402
+
+BASELINE_PATH = ROOT / "benchmarks" / "baselines" / "game24.json"
+SEED = 24
+
+# a benchmark regresses when its median or p99 latency grows by more than this
+DEFAULT_THRESHOLD = 0.25
+
+
+def to_postfix(tokens):
+    output, ops = [], []
+    for token in tokens:
+        if isinstance(token, int):
+            output.append(token)
+        elif token == "(":
+            ops.append(token)
+        elif token == ")":
+            while ops[-1] != "(":
+                output.append(ops.pop())
+            ops.pop()
+        else:
+            while ops and ops[-1] != "(" and PRECEDENCE[ops[-1]] >= PRECEDENCE[token]:
+                output.append(ops.pop())
+            ops.append(token)
+    return output + ops[::-1]
+
+
+def to_prefix(tokens):
+    stack = []
+    for token in to_postfix(tokens):
+        if isinstance(token, int):
+            stack.append([token])
+        else:
+            b = stack.pop()
+            stack.append([token, *stack.pop(), *b])
+    return stack[0]
+
+
+def spell(tokens):
+    return " ".join(map(str, tokens))
+
+
+# the bot's original solver, kept here as a reference point for the solvers
+# that replaced it
+def eval_infix(tokens):
+    tokens = [t if not isinstance(t, list) else eval_infix(t) for t in tokens]
+
+    # division pass
+    while "/" in tokens:
+        i = tokens.index("/")
+        a = tokens[i - 1]
+        b = tokens[i + 1]
+        if b == 0:
+            raise ZeroDivisionError("division by zero")
+        tokens = tokens[: i - 1] + [a / b] + tokens[i + 2 :]
+
+    # multiplication pass
+    while "*" in tokens:
+        i = tokens.index("*")
+        a = tokens[i - 1]
+        b = tokens[i + 1]
+        tokens = tokens[: i - 1] + [a * b] + tokens[i + 2 :]
+
+    # addition and subtraction pass
+    while len(tokens) > 1:
+        a, op, b, *rest = tokens
+        if op == "+":
+            tokens = [a + b] + rest
+        elif op == "-":
+            tokens = [a - b] + rest
+        else:
+            raise ValueError(f"Invalid operator in addition/subtraction pass: {op}")
+    return tokens[0]
+
+
+def solve_24_hardcoded(nums, target=24):
+    visited = set()
+    for a, b, c, d in permutations(nums):
+        if (a, b, c, d) in visited:
+            continue
+        visited.add((a, b, c, d))
+
+        ops = ["+", "-", "*", "/"]
+        for op1 in ops:
+            for op2 in ops:
+                for op3 in ops:
+                    possibilities = [
+                        [[[a, op1, b], op2, c], op3, d],
+                        [[a, op1, [b, op2, c]], op3, d],
+                        [[a, op1, b], op2, [c, op3, d]],
+                        [a, op1, [[b, op2, c], op3, d]],
+                        [a, op1, [b, op2, [c, op3, d]]],
+                    ]
+                    for tokens in possibilities:
+                        try:
+                            if eval_infix(tokens) == target:
+                                return print_tokens(tokens)
+                        except ZeroDivisionError:
+                            continue
+    return None
+
+
+def print_tokens(tokens):
+    if isinstance(tokens, list):
+        return "(" + " ".join(print_tokens(t) for t in tokens) + ")"
+    return str(tokens)
+
+
+NOISE = [
+    "lol",
+    "gg",
+    "wait what",
+    "is this even possible??",
+    "brb",
+    "24",
+    "i think it's 8 * 3",
+    "https://en.wikipedia.org/wiki/24_(puzzle)",
+    "<@123456789012345678> you're too fast",
+    "🤔🤔🤔",
+    "skip?",
+    "no way",
+    "(8 + 4) * 2 is 24 but we don't have a 2",
+    "",
+]
+
+
+class Inputs:
+    """Deterministic inputs shared by the benchmarks."""
+
+    def __init__(self, cog, seed=SEED, count=500):
+        rng = random.Random(seed)
+        table = load_solution_table(PUZZLES_PATH)
+        solved = [(hand, entry[1][0]) for hand, entry in table.items() if entry[1]]
+        picked = [rng.choice(solved) for _ in range(count)]
+
+        self.hands = [tuple(rng.sample(hand, len(hand))) for hand, _ in picked]
+        self.infix = []
+        self.prefix = []
+        self.postfix = []
+        for hand, solution in picked:
+            tokens, _ = tokenize(solution)
+            self.infix.append((solution, hand))
+            self.prefix.append((spell(to_prefix(tokens)), hand))
+            self.postfix.append((spell(to_postfix(tokens)), hand))
+        self.valid = [
+            rng.choice([self.infix, self.prefix, self.postfix])[i] for i in range(count)
+        ]
+
+        self.noise = [(rng.choice(NOISE), hand) for hand in self.hands]
+
+        self.near_misses = []
+        for text, hand in self.infix:
+            kind = rng.randrange(3)
+            if kind == 0:
+                # right shape, wrong number
+                digits = [i for i, char in enumerate(text) if char.isdigit()]
+                i = rng.choice(digits)
+                text = text[:i] + str((int(text[i]) + 1) % 10) + text[i + 1 :]
+            elif kind == 1:
+                text = f"{text} + 1"
+            else:
+                text = text.replace("*", "+", 1).replace("/", "*", 1)
+            self.near_misses.append((text, hand))
+
+        self.adversarial = [
+            ("(" * MAX_DEPTH + "1" + ")" * MAX_DEPTH, (1,)),
+            ("(" * (MAX_DEPTH + 1) + "1" + ")" * (MAX_DEPTH + 1), (1,)),
+            ("(" * 10_000, (1, 2, 3, 4)),
+            ("9" * 10_000, (1, 2, 3, 4)),
+            ("9" * 190, (1, 2, 3, 4)),
+            ("1 + " * 49 + "1", (1,) * 50),
+            ("1" + " " * 198 + "1", (1, 1)),
+            ("((((((((1+2)*3)-4)/5)+6)*7)-8)/9)" * 5, tuple(range(1, 10)) * 5),
+            ("/" * 200, (1, 2, 3, 4)),
+            ("8 / (3 - 8 / 3)" + " " * 185, (3, 3, 8, 8)),
+        ] * (count // 10)
+
+        self.tokens = {
+            name: [tokenize(text)[0] for text, _ in inputs]
+            for name, inputs in [
+                ("infix", self.infix),
+                ("prefix", self.prefix),
+                ("postfix", self.postfix),
+            ]
+        }
+
+        self.cog = cog
+
+
+def benchmarks(inputs):
+    """Return (name, function, argument tuples) for every benchmark."""
+    cog = inputs.cog
+    cases = [
+        ("tokenize/valid", tokenize, [(t,) for t, _ in inputs.valid]),
+        ("tokenize/noise", tokenize, [(t,) for t, _ in inputs.noise]),
+        ("tokenize/adversarial", tokenize, [(t,) for t, _ in inputs.adversarial]),
+    ]
+    for notation, token_lists in inputs.tokens.items():
+        cases.append((f"evaluate/{notation}", evaluate, [(t,) for t in token_lists]))
+    for kind in ["valid", "noise", "near_misses", "adversarial"]:
+        cases.append((f"eval_check/{kind}", cog.eval_check, getattr(inputs, kind)))
+    cases.append(("sample/any", cog.sample, [()]))
+    for level in LEVELS:
+        cases.append((f"sample/{level}", cog.sample, [(level,)]))
+    cases += [
+        ("solve/table", cog.solve, [(hand,) for hand in inputs.hands]),
+        ("solve/hardcoded", solve_24_hardcoded, [(hand,) for hand in inputs.hands]),
+        (
+            "solve/solver",
+            lambda hand: next(Solver(hand).solutions(), None),
+            [(hand,) for hand in inputs.hands],
+        ),
+        (
+            "solve/subset_dp",
+            lambda hand: Solver(hand).can_reach(24),
+            [(hand,) for hand in inputs.hands],
+        ),
+    ]
+    return cases
+
+
+def measure(func, arguments, min_time, min_calls):
+    """Time single calls, cycling through the arguments, for at least `min_time`."""
+    timer = time.perf_counter_ns
+    samples = []
+    total = 0
+    i = 0
+    gc.collect()
+    gc.disable()
+    try:
+        # warm up caches and lazily built state
+        for args in arguments[:10]:
+            func(*args)
+        while total < min_time * 1e9 or len(samples) < min_calls:
+            args = arguments[i % len(arguments)]
+            start = timer()
+            func(*args)
+            elapsed = timer() - start
+            samples.append(elapsed)
+            total += elapsed
+            i += 1
+    finally:
+        gc.enable()
+
+    samples.sort()
+    return {
+        "calls": len(samples),
+        "ops_per_sec": len(samples) / (total / 1e9),
+        "median_us": statistics.median(samples) / 1e3,
+        "p99_us": samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1e3,
+        "max_us": samples[-1] / 1e3,
+    }
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Return the benchmarks that got slower than the baseline by over `threshold`."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        for metric in ["median_us", "p99_us"]:
+            if result[metric] > before[metric] * (1 + threshold):
+                regressions.append((name, metric, before[metric], result[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "-k", dest="pattern", help="only run benchmarks containing this"
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=0.5, help="seconds to spend per benchmark"
+    )
+    parser.add_argument("--min-calls", type=int, default=200)
+    parser.add_argument("--save", action="store_true", help="write the baseline")
+    parser.add_argument("--compare", action="store_true", help="check the baseline")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    cog = Game24(None)
+    asyncio.run(cog.cog_setup())
+    try:
+        inputs = Inputs(cog)
+        results = {}
+        print(
+            f"{'benchmark':<26}{'ops/s':>12}{'median µs':>12}"
+            f"{'p99 µs':>12}{'max µs':>12}"
+        )
+        for name, func, arguments in benchmarks(inputs):
+            if args.pattern and args.pattern not in name:
+                continue
+            result = measure(func, arguments, args.min_time, args.min_calls)
+            results[name] = result
+            print(
+                f"{name:<26}{result['ops_per_sec']:>12,.0f}{result['median_us']:>12.2f}"
+                f"{result['p99_us']:>12.2f}{result['max_us']:>12.2f}"
+            )
+    finally:
+        cog.solver.close()
+        cog.puzzles.close()
+
+    if args.save:
+        if args.pattern and args.baseline.exists():
+            # keep the benchmarks that were not rerun
+            saved = json.loads(args.baseline.read_text())["results"]
+            results = saved | results
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(
+            json.dumps({"environment": environment(), "results": results}, indent=2)
+            + "\n"
+        )
+        print(f"Saved baseline to {args.baseline}.")
+
+    if args.compare:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline["environment"] != environment():
+            print(
+                f"Warning: the baseline was recorded on {baseline['environment']}, "
+                "so differences may not be meaningful."
+            )
+        regressions = compare(results, baseline, args.threshold)
+        for name, metric, before, after in regressions:
+            print(f"REGRESSION {name} {metric}: {before:.2f} -> {after:.2f} µs")
+        if regressions:
+            sys.exit(1)
+        print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
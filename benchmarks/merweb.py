@@ -0,0 +1,114 @@
+"""Checks and times the single-pass Merriam-Webster markup renderer.
+
+Runs offline from the repository root:
+
+    python benchmarks/merweb.py                  # bundled corpus
+    python benchmarks/merweb.py --from-db        # plus cached API responses
+    python benchmarks/merweb.py --from-db --save-corpus
+
+Every string is rendered by both `processed` and `processed_sequential` and
+the outputs must be identical before anything is timed. `--from-db` reads
+the responses stored by the dictionary cache (see `DATABASE_URL`), so the
+corpus can be grown from real lookups.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from unity.util.merweb import processed, processed_sequential  # noqa: E402
+
+CORPUS_PATH = ROOT / "benchmarks" / "data" / "merweb_corpus.json"
+
+
+def markup_strings(value):
+    """Yield every string with markup in a decoded API response."""
+    if isinstance(value, str):
+        if "{" in value:
+            yield value
+    elif isinstance(value, list):
+        for item in value:
+            yield from markup_strings(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from markup_strings(item)
+
+
+async def load_cached_strings():
+    from tortoise import Tortoise
+
+    from unity.db.config import TORTOISE_ORM
+    from unity.db.models import DictionaryEntry
+
+    await Tortoise.init(config=TORTOISE_ORM)
+    try:
+        responses = await DictionaryEntry.all().values_list("response", flat=True)
+    finally:
+        await Tortoise.close_connections()
+    return [text for response in responses for text in markup_strings(response)]
+
+
+def time_renderer(render, texts, min_time):
+    """Return the mean time in microseconds to render every text once."""
+    rounds = 0
+    start = time.perf_counter()
+    while True:
+        for text in texts:
+            render(text)
+        rounds += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--corpus", type=Path, default=CORPUS_PATH)
+    parser.add_argument("--from-db", action="store_true", help="add cached responses")
+    parser.add_argument(
+        "--save-corpus", action="store_true", help="add new strings to the corpus"
+    )
+    parser.add_argument("--min-time", type=float, default=1.0)
+    args = parser.parse_args()
+
+    corpus = json.loads(args.corpus.read_text())
+    texts = list(corpus)
+    if args.from_db:
+        cached = asyncio.run(load_cached_strings())
+        print(f"Read {len(cached)} strings from the dictionary cache.")
+        texts = list(dict.fromkeys(texts + cached))
+        if args.save_corpus:
+            args.corpus.write_text(json.dumps(texts, ensure_ascii=False, indent=1) + "\n")
+            print(f"Saved {len(texts)} strings to {args.corpus}.")
+
+    # the cog renders whole definition blocks as well as single strings
+    blocks = ["\n".join(texts[i : i + 8]) for i in range(0, len(texts), 8)]
+
+    mismatches = 0
+    for text in texts + blocks:
+        if processed(text) != processed_sequential(text):
+            mismatches += 1
+            print(f"MISMATCH {text!r}")
+    if mismatches:
+        print(f"{mismatches} of {len(texts) + len(blocks)} outputs differ.")
+        sys.exit(1)
+    print(f"Outputs identical for {len(texts)} strings and {len(blocks)} blocks.")
+
+    for name, inputs in [("strings", texts), ("blocks", blocks)]:
+        before = time_renderer(processed_sequential, inputs, args.min_time)
+        after = time_renderer(processed, inputs, args.min_time)
+        print(
+            f"{name:<8} sequential {before / len(inputs):8.2f} µs/item   "
+            f"single pass {after / len(inputs):8.2f} µs/item   "
+            f"{before / after:5.1f}x faster"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""A local stand-in for the Merriam-Webster dictionary API.
+
+Serves recorded responses for the collegiate and medical dictionaries under
+the same paths as the real API, so `MerWebWrapper` can use it by changing its
+base URL (the Words cog reads `MWD_BASE_URL`):
+
+    python benchmarks/mwserver.py --port 8080 --latency 0.15 --error-rate 0.01
+    MWD_BASE_URL=http://127.0.0.1:8080/api/v3/references python -m unity
+
+Unknown words get a "did you mean" list of recorded words with the same first
+letter, or an empty list. GET /stats returns the number of requests served per
+dictionary and outcome, and POST /stats resets them.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from aiohttp import web
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+RESPONSES_PATH = ROOT / "benchmarks" / "data" / "mw_responses.json"
+SUGGESTIONS = 5
+
+
+class StandIn:
+    """Recorded API responses with configurable latency, errors and rate limit.
+
+    `latency` and `jitter` are in seconds; each request sleeps for latency
+    plus up to `jitter`. `error_rate` is the fraction of requests that fail
+    with a 500. With `rate_limit` set, requests beyond that many per second
+    get a 429.
+    """
+
+    def __init__(
+        self,
+        responses: dict[str, dict[str, list]],
+        *,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: float | None = None,
+        seed: int | None = None,
+    ):
+        self.responses = {
+            dictionary: {word.lower(): entries for word, entries in words.items()}
+            for dictionary, words in responses.items()
+        }
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        self._tokens = rate_limit or 0.0
+        self._refilled = time.monotonic()
+
+    def _allow(self) -> bool:
+        if self.rate_limit is None:
+            return True
+        now = time.monotonic()
+        self._tokens = min(
+            self.rate_limit, self._tokens + (now - self._refilled) * self.rate_limit
+        )
+        self._refilled = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def lookup(self, dictionary: str, word: str) -> list:
+        words = self.responses[dictionary]
+        if entries := words.get(word.lower()):
+            return entries
+        return [w for w in sorted(words) if w[:1] == word[:1].lower()][:SUGGESTIONS]
+
+    async def handle(self, request: web.Request) -> web.Response:
+        dictionary = request.match_info["dictionary"]
+        word = request.match_info["word"]
+        if dictionary not in self.responses:
+            self.stats[f"{dictionary}:not_found"] += 1
+            raise web.HTTPNotFound()
+        if not self._allow():
+            self.stats[f"{dictionary}:rate_limited"] += 1
+            raise web.HTTPTooManyRequests()
+
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.random.random() < self.error_rate:
+            self.stats[f"{dictionary}:error"] += 1
+            raise web.HTTPInternalServerError()
+
+        self.stats[f"{dictionary}:ok"] += 1
+        return web.json_response(self.lookup(dictionary, word))
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.stats))
+
+    async def reset_stats(self, request: web.Request) -> web.Response:
+        self.stats.clear()
+        return web.json_response({})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/api/v3/references/{dictionary}/json/{word}", self.handle)
+        app.router.add_get("/stats", self.get_stats)
+        app.router.add_post("/stats", self.reset_stats)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> web.AppRunner:
+        """Serve in the running event loop; `base_url(runner)` gives the address."""
+        runner = web.AppRunner(self.app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+def base_url(runner: web.AppRunner) -> str:
+    host, port = runner.addresses[0][:2]
+    return f"http://{host}:{port}/api/v3/references"
+
+
+def load_responses(path: Path = RESPONSES_PATH) -> dict[str, dict[str, list]]:
+    return json.loads(Path(path).read_text())
+
+
+async def load_cached_responses() -> dict[str, dict[str, list]]:
+    """Read the responses stored by the dictionary cache (see `DATABASE_URL`)."""
+    from tortoise import Tortoise
+
+    from unity.db.config import TORTOISE_ORM
+    from unity.db.lookups import is_suggestions
+    from unity.db.models import DictionaryEntry
+
+    await Tortoise.init(config=TORTOISE_ORM)
+    try:
+        rows = await DictionaryEntry.all().values_list(
+            "dictionary", "query", "response"
+        )
+    finally:
+        await Tortoise.close_connections()
+
+    responses = {}
+    for dictionary, query, response in rows:
+        if not is_suggestions(response):
+            responses.setdefault(dictionary, {})[query] = response
+    return responses
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--responses", type=Path, default=RESPONSES_PATH)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, help="requests per second")
+    parser.add_argument("--seed", type=int)
+
+
+def from_arguments(args: argparse.Namespace, responses=None) -> StandIn:
+    return StandIn(
+        responses or load_responses(args.responses),
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    add_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="add the responses stored by the dictionary cache to --responses",
+    )
+    args = parser.parse_args()
+
+    if args.record:
+        responses = load_responses(args.responses)
+        for dictionary, words in asyncio.run(load_cached_responses()).items():
+            responses.setdefault(dictionary, {}).update(words)
+        args.responses.write_text(
+            json.dumps(responses, ensure_ascii=False, indent=1) + "\n"
+        )
+        counts = {dictionary: len(words) for dictionary, words in responses.items()}
+        print(f"Saved {counts} recorded words to {args.responses}.")
+        return
+
+    web.run_app(from_arguments(args).app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
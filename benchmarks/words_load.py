@@ -0,0 +1,222 @@
+"""Load test for /define and /meddefine against the local API stand-in.
+
+Starts `mwserver.StandIn` in-process, points the Words cog at it and runs
+many lookups concurrently through `Words.define_word` and
+`Words.meddefine_word`, including the first page render. Nothing talks to
+Discord and the cog's tables live in an in-memory SQLite database.
+
+    python benchmarks/words_load.py --requests 2000 --concurrency 50
+    python benchmarks/words_load.py --latency 0.3 --error-rate 0.02 --cold
+    python benchmarks/words_load.py --typos 0.2 --no-spelling
+
+Queries are drawn from the recorded words with a Zipf-like skew, plus a share
+of unknown words and of misspelled recorded words. The report shows latency
+percentiles, throughput and how many requests reached the stand-in per
+dictionary. `--no-spelling` turns off the offline spelling check, to compare
+how many of those requests it saves.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import string
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+import discord  # noqa: E402
+from tortoise import Tortoise  # noqa: E402
+
+import mwserver  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    def is_done(self):
+        return self.interaction.sent is not None
+
+    async def send_message(self, content=None, **kwargs):
+        self.interaction.sent = content if content is not None else kwargs
+
+
+class FakeInteraction(discord.Interaction):
+    """Just enough of an interaction for `Paginator.respond`."""
+
+    def __init__(self):
+        self.sent = None
+
+    @property
+    def response(self):
+        return FakeResponse(self)
+
+    @property
+    def user(self):
+        return None
+
+
+class FakeContext:
+    def __init__(self):
+        self.interaction = FakeInteraction()
+        self.responses = []
+
+    async def respond(self, *args, **kwargs):
+        self.responses.append((args, kwargs))
+
+    async def defer(self, *args, **kwargs):
+        pass
+
+
+def misspell(word, rng):
+    """Return the word with one letter dropped, doubled, swapped or replaced."""
+    i = rng.randrange(len(word) - 1)
+    match rng.randrange(4):
+        case 0:
+            return word[:i] + word[i + 1 :]
+        case 1:
+            return word[:i] + word[i] + word[i:]
+        case 2:
+            return word[:i] + word[i + 1] + word[i] + word[i + 2 :]
+        case _:
+            letter = rng.choice(string.ascii_lowercase.replace(word[i], ""))
+            return word[:i] + letter + word[i + 1 :]
+
+
+def workload(responses, count, unknown, typos, seed):
+    """Return (dictionary, query) pairs skewed towards the first recorded words."""
+    rng = random.Random(seed)
+    choices = [
+        (dictionary, word) for dictionary, words in responses.items() for word in words
+    ]
+    weights = [1 / rank for rank in range(1, len(choices) + 1)]
+    queries = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < unknown:
+            dictionary = rng.choice(list(responses))
+            queries.append((dictionary, f"xyz{rng.randrange(count)}"))
+        elif roll < unknown + typos:
+            dictionary, word = rng.choices(choices, weights)[0]
+            queries.append((dictionary, misspell(word, rng) if len(word) > 4 else word))
+        else:
+            queries.append(rng.choices(choices, weights)[0])
+    return queries
+
+
+async def run(args):
+    server = mwserver.from_arguments(args)
+    runner = await server.start()
+    os.environ["MWD_BASE_URL"] = mwserver.base_url(runner)
+
+    await Tortoise.init(
+        db_url="sqlite://:memory:", modules={"models": ["unity.db.models"]}
+    )
+    await Tortoise.generate_schemas()
+
+    # imported late so the cog picks up the stand-in's address
+    from unity.cogs.words import Words
+    from unity.db.lookups import known_words
+    from unity.db.quota import QuotaManager
+    from unity.util.spelling import SpellIndex
+
+    cog = Words(None)
+    await cog.cog_setup()
+    cog.quota = QuotaManager(limit=args.requests * 2)
+    # the recorded words stand in for a full lexicon (MWD_<DICTIONARY>_LEXICON)
+    cog.spelling = {}
+    if not args.no_spelling:
+        for dictionary, words in server.responses.items():
+            cog.spelling[dictionary] = SpellIndex(
+                word for response in words.values() for word in known_words(response)
+            )
+    commands = {
+        "collegiate": Words.define_word.callback,
+        "medical": Words.meddefine_word.callback,
+    }
+
+    queries = workload(
+        server.responses, args.requests, args.unknown, args.typos, args.seed
+    )
+    if not args.cold:
+        # one pass to fill the caches, as a bot that has been up for a while
+        for dictionary, query in dict.fromkeys(queries):
+            try:
+                await commands[dictionary](cog, FakeContext(), query, False)
+            except Exception:
+                pass
+        server.stats.clear()
+
+    latencies = []
+    outcomes = Counter()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(dictionary, query):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await commands[dictionary](cog, FakeContext(), query, False)
+                outcomes["ok"] += 1
+            except Exception:
+                outcomes["error"] += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(dictionary, query) for dictionary, query in queries))
+    elapsed = time.perf_counter() - start
+
+    cog.inflight.cancel()
+    await cog.http.close()
+    await Tortoise.close_connections()
+    await runner.cleanup()
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{len(queries)} requests, concurrency {args.concurrency}, "
+        f"{'cold' if args.cold else 'warm'} caches, "
+        f"spelling check {'off' if args.no_spelling else 'on'}"
+    )
+    print(f"throughput   {len(queries) / elapsed:10.1f} requests/s")
+    for name, value in [
+        ("p50", quantiles[49]),
+        ("p90", quantiles[89]),
+        ("p99", quantiles[98]),
+        ("max", latencies[-1]),
+    ]:
+        print(f"{name:<12} {value * 1000:10.2f} ms")
+    print(f"outcomes     {dict(outcomes)}")
+    upstream = sum(server.stats.values())
+    print(f"upstream     {upstream} call(s) {dict(server.stats)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    mwserver.add_arguments(parser)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=25)
+    parser.add_argument(
+        "--unknown", type=float, default=0.1, help="share of unknown words"
+    )
+    parser.add_argument(
+        "--typos", type=float, default=0.1, help="share of misspelled words"
+    )
+    parser.add_argument("--cold", action="store_true", help="start with empty caches")
+    parser.add_argument(
+        "--no-spelling",
+        action="store_true",
+        help="send likely typos to the stand-in instead of answering locally",
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    if db.capabilities.dialect == "postgres":
+        return """
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+ALTER TABLE "tag" ADD COLUMN IF NOT EXISTS "search" TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('simple', "trigger" || ' ' || "response")) STORED;
+CREATE INDEX IF NOT EXISTS "idx_tag_search" ON "tag" USING GIN ("search");
+CREATE INDEX IF NOT EXISTS "idx_tag_trigger_trgm" ON "tag" USING GIN ("trigger" gin_trgm_ops);"""
+    return """
+        CREATE VIRTUAL TABLE IF NOT EXISTS "tag_fts" USING fts5(
+    "trigger",
+    "response",
+    content='tag',
+    content_rowid='tag_id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS "tag_fts_insert" AFTER INSERT ON "tag" BEGIN
+    INSERT INTO "tag_fts" ("rowid", "trigger", "response")
+    VALUES (new."tag_id", new."trigger", new."response");
+END;
+CREATE TRIGGER IF NOT EXISTS "tag_fts_delete" AFTER DELETE ON "tag" BEGIN
+    INSERT INTO "tag_fts" ("tag_fts", "rowid", "trigger", "response")
+    VALUES ('delete', old."tag_id", old."trigger", old."response");
+END;
+CREATE TRIGGER IF NOT EXISTS "tag_fts_update" AFTER UPDATE ON "tag" BEGIN
+    INSERT INTO "tag_fts" ("tag_fts", "rowid", "trigger", "response")
+    VALUES ('delete', old."tag_id", old."trigger", old."response");
+    INSERT INTO "tag_fts" ("rowid", "trigger", "response")
+    VALUES (new."tag_id", new."trigger", new."response");
+END;
+INSERT INTO "tag_fts" ("tag_fts") VALUES ('rebuild');"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    if db.capabilities.dialect == "postgres":
+        return """
+        DROP INDEX IF EXISTS "idx_tag_trigger_trgm";
+DROP INDEX IF EXISTS "idx_tag_search";
+ALTER TABLE "tag" DROP COLUMN IF EXISTS "search";"""
+    return """
+        DROP TRIGGER IF EXISTS "tag_fts_update";
+DROP TRIGGER IF EXISTS "tag_fts_delete";
+DROP TRIGGER IF EXISTS "tag_fts_insert";
+DROP TABLE IF EXISTS "tag_fts";"""
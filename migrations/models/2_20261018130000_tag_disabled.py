@@ -0,0 +1,14 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    if db.capabilities.dialect == "postgres":
+        return """
+        ALTER TABLE "tag" ADD "disabled" BOOL NOT NULL DEFAULT False;"""
+    return """
+        ALTER TABLE "tag" ADD "disabled" INT NOT NULL DEFAULT 0;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "tag" DROP COLUMN "disabled";"""
@@ -0,0 +1,34 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    if db.capabilities.dialect == "postgres":
+        return """
+        CREATE TABLE IF NOT EXISTS "game24_stats" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "guild_id" BIGINT NOT NULL,
+    "user_id" BIGINT NOT NULL,
+    "solves" INT NOT NULL,
+    "total_time" DOUBLE PRECISION NOT NULL,
+    "best_time" DOUBLE PRECISION,
+    "best_streak" INT NOT NULL,
+    CONSTRAINT "uid_game24_stat_guild_i_50483c" UNIQUE ("guild_id", "user_id")
+);
+CREATE INDEX IF NOT EXISTS "idx_game24_stat_user_id_4e7211" ON "game24_stats" ("user_id");"""
+    return """
+        CREATE TABLE IF NOT EXISTS "game24_stats" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "guild_id" BIGINT NOT NULL,
+    "user_id" BIGINT NOT NULL,
+    "solves" INT NOT NULL,
+    "total_time" REAL NOT NULL,
+    "best_time" REAL,
+    "best_streak" INT NOT NULL,
+    CONSTRAINT "uid_game24_stat_guild_i_50483c" UNIQUE ("guild_id", "user_id")
+);
+CREATE INDEX IF NOT EXISTS "idx_game24_stat_user_id_4e7211" ON "game24_stats" ("user_id");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "game24_stats";"""
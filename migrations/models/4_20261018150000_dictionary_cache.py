@@ -0,0 +1,28 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    if db.capabilities.dialect == "postgres":
+        return """
+        CREATE TABLE IF NOT EXISTS "dictionary_entry" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "dictionary" VARCHAR(32) NOT NULL,
+    "query" VARCHAR(255) NOT NULL,
+    "response" JSONB NOT NULL,
+    "fetched_at" TIMESTAMPTZ NOT NULL,
+    CONSTRAINT "uid_dictionary_diction_3f8a2c" UNIQUE ("dictionary", "query")
+);"""
+    return """
+        CREATE TABLE IF NOT EXISTS "dictionary_entry" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "dictionary" VARCHAR(32) NOT NULL,
+    "query" VARCHAR(255) NOT NULL,
+    "response" JSON NOT NULL,
+    "fetched_at" TIMESTAMP NOT NULL,
+    CONSTRAINT "uid_dictionary_diction_3f8a2c" UNIQUE ("dictionary", "query")
+);"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "dictionary_entry";"""
@@ -0,0 +1,24 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    if db.capabilities.dialect == "postgres":
+        return """
+        CREATE TABLE IF NOT EXISTS "api_quota" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "name" VARCHAR(32) NOT NULL UNIQUE,
+    "window_start" TIMESTAMPTZ NOT NULL,
+    "used" INT NOT NULL
+);"""
+    return """
+        CREATE TABLE IF NOT EXISTS "api_quota" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "name" VARCHAR(32) NOT NULL UNIQUE,
+    "window_start" TIMESTAMP NOT NULL,
+    "used" INT NOT NULL
+);"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "api_quota";"""
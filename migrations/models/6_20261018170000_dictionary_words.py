@@ -0,0 +1,17 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    if db.capabilities.dialect == "postgres":
+        return """
+        ALTER TABLE "dictionary_entry" ADD "headwords" JSONB;
+        ALTER TABLE "dictionary_entry" ADD "known_words" JSONB;"""
+    return """
+        ALTER TABLE "dictionary_entry" ADD "headwords" JSON;
+        ALTER TABLE "dictionary_entry" ADD "known_words" JSON;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "dictionary_entry" DROP COLUMN "headwords";
+        ALTER TABLE "dictionary_entry" DROP COLUMN "known_words";"""
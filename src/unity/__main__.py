@@ -5,7 +5,7 @@ import sys
 import discord
 from dotenv import load_dotenv
 
-from .bot import UnityBot
+from .bot import DEFAULT_MAX_MESSAGES, UnityBot
 
 dotenv_path = sys.argv[2] if len(sys.argv) > 2 else ".env"
 if not os.path.exists(dotenv_path):
@@ -30,6 +30,14 @@ ch.setFormatter(fmt)
 debug_guilds = (
     os.getenv("DEBUG_GUILDS").split(",") if os.getenv("DEBUG_GUILDS") else None
 )
+# comma-separated cog names, e.g. "dev,words"; all cogs are loaded if unset
+cogs = (
+    [name.strip() for name in os.getenv("BOT_COGS").split(",")]
+    if os.getenv("BOT_COGS")
+    else None
+)
+# messages kept in memory for edit and delete events; 0 keeps none
+max_messages = int(os.getenv("BOT_MAX_MESSAGES", DEFAULT_MAX_MESSAGES)) or None
 status = os.getenv("BOT_STATUS", "online").lower()
 activity_type = os.getenv("BOT_ACTIVITY_TYPE", "playing").lower()
 activity_name = os.getenv("BOT_ACTIVITY_NAME", None)
@@ -46,5 +54,7 @@ bot = UnityBot(
     status=getattr(discord.Status, status, discord.Status.online),
     activity=activity,
     debug_guilds=debug_guilds,
+    cogs=cogs,
+    max_messages=max_messages,
 )
 bot.run(os.getenv("DISCORD_TOKEN"))
@@ -1,14 +1,49 @@
+import asyncio
 import logging
-from pathlib import Path
+import pkgutil
+import time
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
 
 import discord
 from tortoise import Tortoise
 
+from . import cogs as cogs_package
 from .db.config import TORTOISE_ORM
+from .intents import COG_INTENTS
 
 logger = logging.getLogger(__name__)
 
 
+# messages kept in memory for edit and delete events
+DEFAULT_MAX_MESSAGES = 100
+# py-cord's own default, which the bot used before capping it
+PYCORD_MAX_MESSAGES = 1000
+
+
+def discover_cogs() -> list[str]:
+    """Return the names of the modules in the `unity.cogs` package."""
+    return sorted(module.name for module in pkgutil.iter_modules(cogs_package.__path__))
+
+
+def cog_intents(name: str) -> discord.Intents:
+    """Return the gateway intents a cog needs, from `COG_INTENTS`."""
+    return COG_INTENTS.get(name, discord.Intents.none())
+
+
+def required_intents(names: list[str]) -> discord.Intents:
+    """Combine the intents needed by the given cogs with the bot's own."""
+    # guilds are needed for the guild and channel caches
+    intents = discord.Intents(guilds=True)
+    for name in names:
+        intents |= cog_intents(name)
+    return intents
+
+
 class UnityBot(discord.Bot):
 
     def __init__(
@@ -17,37 +52,134 @@ class UnityBot(discord.Bot):
         activity=None,
         status=None,
         debug_guilds=None,
-        cogs_path=Path("src/unity/cogs"),
+        cogs=None,
+        max_messages=DEFAULT_MAX_MESSAGES,
         **options,
     ):
+        available = discover_cogs()
+        cogs = available if cogs is None else cogs
+
+        # only subscribe to the events the loaded cogs use, and only cache
+        # the members those events bring in
+        intents = required_intents([name for name in cogs if name in available])
+        self.max_messages = max_messages
         super().__init__(
             activity=activity,
             status=status,
             debug_guilds=debug_guilds,
-            intents=discord.Intents.all(),
+            intents=intents,
+            member_cache_flags=discord.MemberCacheFlags.from_intents(intents),
+            max_messages=max_messages,
             **options,
         )
 
-        # load all the cogs
-        cogs_path = Path(cogs_path)
-        if not cogs_path.exists():
-            raise FileNotFoundError(f"The directory {cogs_path} does not exist.")
+        # cogs with a `cog_setup` coroutine are set up during login; any
+        # loaded after that are set up as soon as they are added. Cogs with a
+        # `cog_teardown` coroutine are torn down when removed or on close.
+        self.cogs_set_up = False
+        self.cog_tasks: set[asyncio.Task] = set()
 
-        for file in cogs_path.glob("*.py"):
-            extension = f"unity.cogs.{file.stem}"
+        # load the given cogs, or all of them
+        for name in cogs:
+            extension = f"unity.cogs.{name}"
+            if name not in available:
+                logger.error(f"Extension {extension} does not exist.")
+                continue
+            start = time.perf_counter()
             try:
                 self.load_extension(extension)
-                logger.info(f"Loaded extension '{extension}'.")
+                elapsed = (time.perf_counter() - start) * 1000
+                logger.info(f"Loaded extension '{extension}' in {elapsed:.1f} ms.")
             except Exception as e:
                 logger.error(f"Failed to load extension {extension}.", exc_info=e)
 
-    async def login(self, token):
-        # use this pocket to set up database connection
+    def add_cog(self, cog, *, override=False):
+        super().add_cog(cog, override=override)
+        needed = cog_intents(type(cog).__module__.removeprefix("unity.cogs."))
+        missing = [
+            name for name, value in needed if value and not getattr(self.intents, name)
+        ]
+        if missing:
+            logger.warning(
+                f"Cog {cog.qualified_name} needs intents the bot started without: "
+                f"{', '.join(missing)}."
+            )
+        if self.cogs_set_up and hasattr(cog, "cog_setup"):
+            self.track(self.setup_cog(cog))
+
+    def remove_cog(self, name):
+        cog = super().remove_cog(name)
+        if cog is not None and hasattr(cog, "cog_teardown"):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                # removed before the bot started, nothing to tear down yet
+                return cog
+            self.track(self.teardown_cog(cog))
+        return cog
+
+    def track(self, coro):
+        """Run a cog setup or teardown in a task that `close` waits for."""
+        task = asyncio.create_task(coro)
+        self.cog_tasks.add(task)
+        task.add_done_callback(self.cog_tasks.discard)
+
+    async def teardown_cog(self, cog):
+        try:
+            await cog.cog_teardown()
+        except Exception as e:
+            logger.error(f"Failed to tear down cog {cog.qualified_name}.", exc_info=e)
+
+    async def setup_cog(self, cog):
+        """Run a cog's `cog_setup`, removing the cog if it fails."""
+        start = time.perf_counter()
+        try:
+            await cog.cog_setup()
+        except Exception as e:
+            logger.error(f"Failed to set up cog {cog.qualified_name}.", exc_info=e)
+            self.remove_cog(cog.qualified_name)
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        logger.info(f"Set up cog '{cog.qualified_name}' in {elapsed:.1f} ms.")
+
+    async def setup_cogs(self):
+        await asyncio.gather(
+            *(
+                self.setup_cog(cog)
+                for cog in list(self.cogs.values())
+                if hasattr(cog, "cog_setup")
+            )
+        )
+        self.cogs_set_up = True
+
+    async def close(self):
+        if self.is_closed():
+            return
+        # finish pending setups and teardowns, then tear down the loaded cogs
+        # so they can flush their buffers and close their sessions
+        await asyncio.gather(*self.cog_tasks)
+        await asyncio.gather(
+            *(
+                self.teardown_cog(cog)
+                for cog in list(self.cogs.values())
+                if hasattr(cog, "cog_teardown")
+            )
+        )
+        await super().close()
+
+    async def connect_database(self):
         await Tortoise.init(config=TORTOISE_ORM)
         logger.info("Database connection established.")
 
-        # then log in
-        await super().login(token)
+    async def login(self, token):
+        # use this pocket to set up the database connection and the cogs, at
+        # the same time as logging in
+        start = time.perf_counter()
+        await asyncio.gather(
+            self.connect_database(), self.setup_cogs(), super().login(token)
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        logger.info(f"Started up in {elapsed:.1f} ms.")
 
     async def on_ready(self):
         logger.info(f"Logged in as {self.user}. (ID: {self.user.id})")
@@ -58,5 +190,40 @@ class UnityBot(discord.Bot):
                 f"Activity set to {self.activity.type.name + " " + self.activity.name if self.activity.type is not discord.ActivityType.custom else self.activity.name}."
             )
         logger.info(f"Connected to {len(self.guilds)} guild(s).")
+        self.log_cache_usage()
         for guild in self.guilds:
             logger.debug(f"Connected to guild: {guild.name}. (ID: {guild.id})")
+
+    def log_cache_usage(self):
+        """Log the intents in use and how much the bot caches because of them."""
+        enabled = [name for name, value in self.intents if value]
+        skipped = [name for name, value in self.intents if not value]
+        logger.info(
+            f"Intents: {', '.join(enabled)}; not requested: {', '.join(skipped)}."
+        )
+
+        cached = sum(len(guild.members) for guild in self.guilds)
+        total = sum(guild.member_count or 0 for guild in self.guilds)
+        messages = (
+            f"up to {self.max_messages} message(s)"
+            if self.max_messages
+            else "no messages"
+        )
+        usage = (
+            f"Caching {cached} of {total} member(s), "
+            f"{len(self.users)} user(s) and {messages}"
+        )
+        if resource is not None:
+            # kilobytes on Linux
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            usage += f", peak memory {peak:.1f} MB"
+        logger.info(f"{usage}.")
+
+        # with every intent, all members, presences and the default number of
+        # messages would be cached
+        members = total - cached
+        messages = max(PYCORD_MAX_MESSAGES - (self.max_messages or 0), 0)
+        logger.info(
+            f"Compared with all intents, not caching {members} member(s), "
+            f"{messages} message(s) or any presences."
+        )
@@ -1,28 +1,107 @@
+import asyncio
 import logging
-import random
+import re
 import time
-from itertools import permutations
 
 import discord
 from discord.ext import commands
 
+from ..db.models import Game24Stats
+from ..db.stats import Leaderboard, SolveStats, save_stats
+from ..util.callworker import CallWorker, WorkerError
+from ..util.game24 import check_answer, load_solution_table
+from ..util.paths import DATA_DIR
+from ..util.puzzles import LEVELS, PuzzleStore, build_store
+from ..util.router import ChannelRouter
+from ..util.solver import (
+    ALL_OPERATORS,
+    DEFAULT_OPERATORS,
+    MAX_HAND_SIZE,
+    Solver,
+    solve_hand,
+)
+from ..util.timerwheel import TimerWheel
+from ..util.writebehind import WriteBehindQueue
+
 logger = logging.getLogger(__name__)
 
 
+PUZZLES_PATH = DATA_DIR / "game24" / "4d12.txt"
+STORE_PATH = DATA_DIR / "game24" / "4d12.bin"
+
+# limits for /twentyfour solve, which runs in a worker process
+MAX_SOLVE_NUMBER = 1000
+SOLVE_TIMEOUT = 30
+SOLUTIONS_SHOWN = 10
+
+
+def load_puzzles() -> tuple[PuzzleStore, dict]:
+    """Return the puzzle store and the table of known solutions."""
+    # generated with `python -m unity.util.puzzles data/game24/4d12.bin`
+    try:
+        puzzles = PuzzleStore.open(STORE_PATH)
+    except FileNotFoundError:
+        logger.warning("No puzzle store found, building one from the text file.")
+        with open(PUZZLES_PATH) as f:
+            hands = [tuple(map(int, line.split())) for line in f if line.strip()]
+        puzzles = PuzzleStore(build_store(hands))
+
+    # generated with `python -m unity.util.game24 data/game24/4d12.txt`
+    try:
+        solutions = load_solution_table(PUZZLES_PATH)
+    except FileNotFoundError:
+        logger.warning("No solutions file found, hands will be solved on request.")
+        solutions = {}
+    return puzzles, solutions
+
+
 class Game24(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.games = set()
-
-        with open("data/game24/4d12.txt") as f:
-            self.solvable = [
-                tuple(map(int, line.strip().split()))
-                for line in f.readlines()
-                if line.strip()
-            ]
-
-    def sample(self):
-        return random.choice(list(permutations(random.choice(self.solvable))))
+        self.router = ChannelRouter()
+        self.timers = TimerWheel()
+
+        # solves are buffered and written to the database in batches
+        self.stats = WriteBehindQueue(save_stats, SolveStats.merge, interval=30)
+        self.leaderboard_cache = Leaderboard(ttl=60)
+
+        # solving bigger hands can take a while, so keep it off the event loop
+        # in a process that is killed if it runs past the time limit
+        self.solver = CallWorker("unity-solver")
+
+        # loaded by `cog_setup`
+        self.puzzles = None
+        self.solutions = {}
+
+    async def cog_setup(self):
+        self.puzzles, self.solutions = await asyncio.to_thread(load_puzzles)
+
+    async def cog_teardown(self):
+        # write out the solves still buffered
+        await self.stats.close()
+
+    def cog_unload(self):
+        if self.puzzles is not None:
+            self.puzzles.close()
+        self.timers.stop()
+        self.solver.close()
+        for _, waiter in self.router.waiters.values():
+            waiter.cancel()
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        """Hand the message to the game running in its channel, if any."""
+        self.router.dispatch(message)
+
+    def solve(self, nums):
+        if entry := self.solutions.get(tuple(sorted(nums))):
+            return entry[1][0] if entry[1] else None
+        # same solver as the table, so both give the same first solution
+        return next(Solver(nums).solutions(), None)
+
+    def sample(self, difficulty=None):
+        return self.puzzles.sample(difficulty)
 
     twentyfour = discord.SlashCommandGroup("twentyfour", "Play the 24 game")
 
@@ -34,25 +113,43 @@ class Game24(commands.Cog):
         required=False,
         default=5,
     )
-    async def start_game(self, ctx, timeout: int):
+    @discord.option(
+        "difficulty",
+        str,
+        description="Only deal hands of this difficulty (default any)",
+        choices=LEVELS,
+        required=False,
+        default=None,
+    )
+    async def start_game(self, ctx, timeout: int, difficulty: str):
         """Start a new game of 24."""
+        if self.puzzles is None:
+            # the cog was just loaded and `cog_setup` is still running
+            await ctx.respond(
+                "The 24 game is still loading, try again in a moment.", ephemeral=True
+            )
+            return
         if ctx.channel.id in self.games:
             await ctx.respond("A game is already running in this channel.")
             return
         self.games.add(ctx.channel.id)
 
         await ctx.respond("Starting a new game of 24!")
+        guild_id = ctx.guild.id if ctx.guild else 0
+        last_solver, streak = None, 0
         while True:
-            nums = self.sample()
+            nums = self.sample(difficulty)
             start_time = time.time()
             prompt = await ctx.send(", ".join(map(str, nums)))
+            waiter = self.router.wait_for(
+                ctx.channel.id, lambda m: self.eval_check(m.content, nums)
+            )
+            timer = self.timers.schedule(
+                timeout * 60,
+                lambda: waiter.done() or waiter.set_exception(TimeoutError()),
+            )
             try:
-                answer = await self.bot.wait_for(
-                    "message",
-                    check=lambda m: m.channel == ctx.channel
-                    and self.eval_check(m.content, nums),
-                    timeout=timeout * 60,
-                )
+                answer = await waiter
             except TimeoutError:
                 self.games.remove(ctx.channel.id)
                 await prompt.edit(
@@ -61,6 +158,8 @@ class Game24(commands.Cog):
                 )
                 await ctx.send("24 game ended due to timeout.")
                 return
+            finally:
+                timer.cancel()
 
             if answer.content.lower() in ["quit", "exit", "stop"]:
                 self.games.remove(ctx.channel.id)
@@ -71,11 +170,13 @@ class Game24(commands.Cog):
                 return
             if answer.content.lower() in ["skip", "pass"]:
                 await prompt.edit(
-                    content=", ".join(map(str, nums)) + f"\n-# Skipped by {answer.author.mention}."
+                    content=", ".join(map(str, nums))
+                    + f"\n-# Skipped by {answer.author.mention}."
                 )
+                last_solver = None
                 continue
             if answer.content.lower() in ["solve"]:
-                solution = solve_24_hardcoded(nums)
+                solution = self.solve(nums)
                 if solution:
                     await prompt.edit(
                         content=", ".join(map(str, nums))
@@ -86,202 +187,170 @@ class Game24(commands.Cog):
                         content=", ".join(map(str, nums))
                         + f"\n-# No solution exists (this should not happen)."
                     )
+                last_solver = None
                 continue
             elapsed = time.time() - start_time
+            streak = streak + 1 if answer.author.id == last_solver else 1
+            last_solver = answer.author.id
+            self.stats.put(
+                (guild_id, answer.author.id), SolveStats.solve(elapsed, streak)
+            )
             await prompt.edit(
                 content=", ".join(map(str, nums))
                 + f"\n-# {answer.author.mention} got it in {elapsed:.2f} seconds with `{answer.content}`."
             )
 
-    def eval_check(self, expr, nums, target=24):
-        if expr.lower() in ["quit", "exit", "stop", "skip", "pass", "solve"]:
-            return True
+    @twentyfour.command(name="solve")
+    @discord.option(
+        "numbers",
+        str,
+        description=f"Up to {MAX_HAND_SIZE} numbers separated by spaces or commas",
+    )
+    @discord.option(
+        "target",
+        int,
+        description="Number to make (default 24)",
+        required=False,
+        default=24,
+    )
+    @discord.option(
+        "operators",
+        str,
+        description=f"Operators to use out of {''.join(ALL_OPERATORS)} "
+        f"(default {DEFAULT_OPERATORS})",
+        required=False,
+        default=DEFAULT_OPERATORS,
+    )
+    async def solve_command(self, ctx, numbers: str, target: int, operators: str):
+        """Find solutions for any hand and target."""
+        parts = [part for part in re.split(r"[\s,]+", numbers) if part]
+        if not 1 <= len(parts) <= MAX_HAND_SIZE or not all(
+            re.fullmatch(r"-?\d{1,4}", part) for part in parts
+        ):
+            await ctx.respond(
+                f"Give between 1 and {MAX_HAND_SIZE} whole numbers.", ephemeral=True
+            )
+            return
+        nums = [int(part) for part in parts]
+        if any(abs(num) > MAX_SOLVE_NUMBER for num in nums):
+            await ctx.respond(
+                f"Numbers can be at most {MAX_SOLVE_NUMBER}.", ephemeral=True
+            )
+            return
+        operators = "".join(dict.fromkeys(operators.replace(" ", "")))
+        if not operators or set(operators) - set(ALL_OPERATORS):
+            await ctx.respond(
+                f"Operators must be chosen from {' '.join(ALL_OPERATORS)}.",
+                ephemeral=True,
+            )
+            return
+
+        await ctx.defer()
         try:
-            tokens = tokenize(expr)
-        except Exception:
-            return False
+            solutions, more = await self.solver.call(
+                solve_hand,
+                nums,
+                target,
+                operators,
+                SOLUTIONS_SHOWN,
+                timeout=SOLVE_TIMEOUT,
+            )
+        except TimeoutError:
+            await ctx.respond("That took too long to solve, try a smaller hand.")
+            return
+        except WorkerError as e:
+            logger.error(f"Failed to solve {nums}.", exc_info=e)
+            await ctx.respond("Something went wrong solving that hand, try again.")
+            return
 
-        inums = extract_nums(tokens)
-        if sorted(inums) != sorted(nums):
-            return False
+        hand = ", ".join(map(str, nums))
+        if not solutions:
+            await ctx.respond(f"There is no way to make {target} from {hand}.")
+            return
+        lines = [f"`{solution}`" for solution in solutions]
+        if more:
+            lines.append(f"-# Showing the first {len(solutions)} solutions.")
+        await ctx.respond(
+            embed=discord.Embed(
+                title=f"Making {target} from {hand}",
+                description="\n".join(lines),
+                color=discord.Color.green(),
+            )
+        )
 
-        result = self.eval_expr(expr)
-        return result == target
+    @twentyfour.command(name="leaderboard")
+    @discord.option(
+        "by",
+        str,
+        description="What to rank players by (default solves)",
+        choices=list(Leaderboard.ORDERINGS),
+        required=False,
+        default="solves",
+    )
+    async def leaderboard(self, ctx, by: str):
+        """Show the best 24 players in this server."""
+        rows = await self.leaderboard_cache.top(ctx.guild.id if ctx.guild else 0, by)
+        if not rows:
+            await ctx.respond("No games of 24 have been solved here yet.")
+            return
 
-    def eval_expr(self, expr):
-        try:
-            tokens = tokenize(expr)
-        except Exception:
-            pass
-        try:
-            return eval_infix(tokens)
-        except Exception:
-            pass
-        try:
-            return eval_postfix(tokens)
-        except Exception:
-            pass
-        try:
-            return eval_prefix(tokens)
-        except Exception:
-            pass
-
-
-def tokenize(text):
-    tokens = []
-    i = 0
-    while i < len(text):
-        char = text[i]
-        if char in "0123456789":
-            buffer = char
-            while i + 1 < len(text) and text[i + 1] in "0123456789":
-                i += 1
-                buffer += text[i]
-            tokens.append(int(buffer))
-        elif char in "+-*/":
-            tokens.append(char)
-        elif char in '(':
-            j = i
-            depth = 1
-            while depth > 0:
-                j += 1
-                if text[j] == '(':
-                    depth += 1
-                elif text[j] == ')':
-                    depth -= 1
-            tokens.append(tokenize(text[i + 1:j]))
-            i = j
-        elif char in " ":
-            pass
-        else:
-            raise ValueError(f"Invalid character in expression: {char}")
-        i += 1
-    return tokens
-
-
-def extract_nums(tokens):
-    print("extracting nums from", tokens)
-    nums = []
-    for t in tokens:
-        if isinstance(t, list):
-            nums.extend(extract_nums(t))
-        elif isinstance(t, (int, float)):
-            nums.append(t)
-    return nums
-
-
-def eval_prefix(tokens):
-    def helper(tokens):
-        token = tokens.pop(0)
-        if isinstance(token, list):
-            return helper(token)
-        if isinstance(token, (int, float)):
-            return token
-        a = helper(tokens)
-        b = helper(tokens)
-        if token == "+":
-            return a + b
-        elif token == "-":
-            return a - b
-        elif token == "*":
-            return a * b
-        elif token == "/":
-            if b == 0:
-                raise ZeroDivisionError("division by zero")
-            return a / b
-        else:
-            raise ValueError(f"Invalid operator: {token}")
-
-    return helper(tokens)
-
-
-def eval_infix(tokens):
-    tokens = [t if not isinstance(t, list) else eval_infix(t) for t in tokens]
-
-    # division pass
-    while "/" in tokens:
-        i = tokens.index("/")
-        a = tokens[i - 1]
-        b = tokens[i + 1]
-        if b == 0:
-            raise ZeroDivisionError("division by zero")
-        tokens = tokens[: i - 1] + [a / b] + tokens[i + 2 :]
-
-    # multiplication pass
-    while "*" in tokens:
-        i = tokens.index("*")
-        a = tokens[i - 1]
-        b = tokens[i + 1]
-        tokens = tokens[: i - 1] + [a * b] + tokens[i + 2 :]
-
-    # addition and subtraction pass
-    while len(tokens) > 1:
-        a, op, b, *rest = tokens
-        if op == "+":
-            tokens = [a + b] + rest
-        elif op == "-":
-            tokens = [a - b] + rest
-        else:
-            raise ValueError(f"Invalid operator in addition/subtraction pass: {op}")
-    return tokens[0]
-
-
-def eval_postfix(tokens):
-    stack = []
-    for token in tokens:
-        if isinstance(token, (int, float)):
-            stack.append(token)
-        elif token in "+-*/":
-            b = stack.pop()
-            a = stack.pop()
-            if token == "+":
-                stack.append(a + b)
-            elif token == "-":
-                stack.append(a - b)
-            elif token == "*":
-                stack.append(a * b)
-            elif token == "/":
-                if b == 0:
-                    raise ZeroDivisionError("division by zero")
-                stack.append(a / b)
-            else:
-                raise ValueError(f"Invalid operator in postfix expression: {token}")
-    if len(stack) != 1:
-        raise ValueError("Invalid postfix expression")
-    return stack[0]
-
-
-def solve_24_hardcoded(nums, target=24):
-    visited = set()
-    for a, b, c, d in permutations(nums):
-        if (a, b, c, d) in visited:
-            continue
-        visited.add((a, b, c, d))
-
-        ops = ['+', '-', '*', '/']
-        for op1 in ops:
-            for op2 in ops:
-                for op3 in ops:
-                    possibilities = [
-                        [[[a, op1, b], op2, c], op3, d],
-                        [[a, op1, [b, op2, c]], op3, d],
-                        [[a, op1, b], op2, [c, op3, d]],
-                        [a, op1, [[b, op2, c], op3, d]],
-                        [a, op1, [b, op2, [c, op3, d]]],
-                    ]
-                    for tokens in possibilities:
-                        try:
-                            if eval_infix(tokens) == target:
-                                return print_tokens(tokens)
-                        except ZeroDivisionError:
-                            continue
-    return None
-
-
-def print_tokens(tokens):
-    if isinstance(tokens, list):
-        return "(" + " ".join(print_tokens(t) for t in tokens) + ")"
-    return str(tokens)
+        lines = [
+            f"{rank}. <@{row['user_id']}> {row['solves']} solve(s), "
+            f"best {row['best_time']:.2f}s, "
+            f"average {row['total_time'] / row['solves']:.2f}s, "
+            f"best streak {row['best_streak']}"
+            for rank, row in enumerate(rows, start=1)
+        ]
+        await ctx.respond(
+            embed=discord.Embed(
+                title=f"24 leaderboard by {by}",
+                description="\n".join(lines),
+                color=discord.Color.gold(),
+            ),
+            allowed_mentions=discord.AllowedMentions.none(),
+        )
+
+    @twentyfour.command(name="stats")
+    async def player_stats(self, ctx, user: discord.User = None):
+        """Show a player's 24 stats."""
+        user = user or ctx.author
+        rows = await Game24Stats.filter(user_id=user.id)
+        if not rows:
+            await ctx.respond(
+                f"{user.mention} has not solved any games of 24 yet.",
+                allowed_mentions=discord.AllowedMentions.none(),
+            )
+            return
+
+        guild_id = ctx.guild.id if ctx.guild else 0
+        embed = discord.Embed(title=f"24 stats for {user.display_name}")
+        for name, selected in [
+            ("This server", [row for row in rows if row.guild_id == guild_id]),
+            ("Everywhere", rows),
+        ]:
+            if not selected:
+                continue
+            stats = SolveStats()
+            for row in selected:
+                stats = stats.merge(
+                    SolveStats(
+                        row.solves, row.total_time, row.best_time, row.best_streak
+                    )
+                )
+            embed.add_field(
+                name=name,
+                value=f"{stats.solves} solve(s)\n"
+                f"best {stats.best_time:.2f}s\n"
+                f"average {stats.total_time / stats.solves:.2f}s\n"
+                f"best streak {stats.best_streak}",
+            )
+        embed.set_footer(text="Recent solves may take a moment to show up.")
+        await ctx.respond(embed=embed)
+
+    def eval_check(self, expr, nums, target=24):
+        if expr.lower() in ["quit", "exit", "stop", "skip", "pass", "solve"]:
+            return True
+        return check_answer(expr, nums, target)
 
 
 def setup(bot):
@@ -1,28 +1,88 @@
 import logging
 import re
+import tempfile
 
+import aiohttp
 import discord
 from discord.ext import commands
-from discord.ext.pages import Page, Paginator
+from discord.ext.pages import Page
 
+from ..db import bulk
 from ..db.models import Tag
+from ..db.search import (
+    REGEX_SCAN_LIMIT,
+    fetch_tags,
+    page_start_ids,
+    regex_search_tag_ids,
+    search_tag_ids,
+)
+from ..util.callworker import CallWorker, WorkerError
+from ..util.http import SharedSession
+from ..util.pages import LazyPaginator
+from ..util.triggers import TriggerIndex, compile_trigger
 
 logger = logging.getLogger(__name__)
 
 
 DISCORD_EMBED_LIMIT = 6000  # Discord's embed description limit is 6000 characters
+TAGS_PER_PAGE = 10
+
+# imports are downloaded to a temporary file; larger attachments are refused
+MAX_IMPORT_SIZE = 8 * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def truncated(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def tag_page(title: str, color: discord.Color, tags: list[Tag]) -> Page:
+    title = truncated(title, 256)
+    embed = discord.Embed(title=title, color=color)
+
+    # split the embed limit evenly so a full page of long tags still fits
+    budget = (DISCORD_EMBED_LIMIT - len(title)) // TAGS_PER_PAGE - 8
+    for tag in tags:
+        name = truncated(tag.trigger, min(budget // 4, 250))
+        embed.add_field(
+            name=f"`{name}`",
+            value=truncated(tag.response, min(budget - len(name), 1024)),
+            inline=False,
+        )
+    return Page(embeds=[embed])
 
 
 class Tags(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.triggers = TriggerIndex()
+        self.http = SharedSession()
+        # user regexes can backtrack for a long time, so searches run in a
+        # process that is killed when they overrun
+        self.search_worker = CallWorker("unity-tag-search")
+
+    async def cog_teardown(self):
+        await self.http.close()
+
+    def cog_unload(self):
+        self.triggers.close()
+        self.search_worker.close()
 
     tag = discord.SlashCommandGroup("tag", "Manage and use tags")
 
     @tag.command(name="create")
     async def create_tag(self, ctx, trigger: str, *, response: str):
         """Create a new tag."""
-        await Tag.create(trigger=trigger, response=response)
+        try:
+            compile_trigger(trigger)
+        except re.error as e:
+            await ctx.respond(f"Invalid trigger `{trigger}`: {e}")
+            return
+        if not await self.triggers.probe(trigger):
+            await ctx.respond(f"Trigger `{trigger}` is too slow to evaluate.")
+            return
+        tag = await Tag.create(trigger=trigger, response=response)
+        self.triggers.add(tag)
         logger.debug(f"Tag '{trigger}' created with response: {response}")
         await ctx.respond(f"Tag created: `{trigger}` → `{response}`")
 
@@ -32,65 +92,146 @@ class Tags(commands.Cog):
         tag = await Tag.get_or_none(trigger=trigger)
         if tag:
             await tag.delete()
+            self.triggers.remove(tag.tag_id)
             logger.debug(f"Tag '{trigger}' deleted.")
             await ctx.respond(f"Tag deleted: `{trigger}`")
         else:
             logger.debug(f"Attempted to delete non-existent tag '{trigger}'.")
             await ctx.respond(f"Tag not found: `{trigger}`")
 
+    @tag.command(name="refresh")
+    @commands.is_owner()
+    async def refresh_tags(self, ctx):
+        """Reload tag triggers from the database."""
+        await self.triggers.refresh()
+        await ctx.respond(f"Reloaded {len(self.triggers)} tag trigger(s).")
+
+    @tag.command(name="export")
+    @commands.is_owner()
+    async def export_tags(self, ctx):
+        """Export all tags as a JSON lines file."""
+        await ctx.defer()
+        with tempfile.TemporaryFile() as fp:
+            count = await bulk.export_tags(fp)
+            fp.seek(0)
+            await ctx.respond(
+                f"Exported {count} tag(s).",
+                file=discord.File(fp, filename="tags.jsonl"),
+            )
+
+    @tag.command(name="import")
+    @commands.is_owner()
+    @discord.option(
+        "on_conflict",
+        str,
+        description="What to do with triggers that already exist (default skip)",
+        choices=bulk.CONFLICT_MODES,
+        required=False,
+        default="skip",
+    )
+    async def import_tags(self, ctx, file: discord.Attachment, on_conflict: str):
+        """Import tags from a JSON lines file."""
+        if file.size > MAX_IMPORT_SIZE:
+            await ctx.respond(
+                f"Import files can be at most {MAX_IMPORT_SIZE // 1024 // 1024} MB.",
+                ephemeral=True,
+            )
+            return
+        await ctx.defer()
+
+        async def validate(trigger):
+            try:
+                compile_trigger(trigger)
+            except re.error:
+                return False
+            return await self.triggers.probe(trigger)
+
+        # stream the attachment to disk and import it line by line, instead of
+        # holding the whole file in memory
+        with tempfile.TemporaryFile() as fp:
+            try:
+                async with self.http.get().get(file.url) as response:
+                    response.raise_for_status()
+                    async for chunk in response.content.iter_chunked(
+                        DOWNLOAD_CHUNK_SIZE
+                    ):
+                        fp.write(chunk)
+            except (aiohttp.ClientError, TimeoutError) as e:
+                logger.error(f"Failed to download tag import {file.url}.", exc_info=e)
+                await ctx.respond("Could not download the import file, try again.")
+                return
+            fp.seek(0)
+
+            try:
+                stats = await bulk.import_tags(fp, on_conflict, validate)
+            except bulk.TagConflictError as e:
+                await ctx.respond(f"Import aborted, nothing was changed: {e}")
+                return
+
+        await self.triggers.refresh()
+        await ctx.respond(
+            f"Imported tags: {stats['created']} created, {stats['updated']} updated, "
+            f"{stats['skipped']} skipped, {stats['invalid']} invalid."
+        )
+
     @tag.command(name="list")
     async def list_tags(self, ctx):
         """List all tags."""
-        tags = await Tag.all()
-        if not tags:
+        starts = await page_start_ids(TAGS_PER_PAGE)
+        if not starts:
             await ctx.respond("No tags defined.")
             return
 
-        pages = []
-        buffer = discord.Embed(title="Tags", color=discord.Color.blue())
-        for tag in tags:
-            if (
-                len(buffer) + len(tag.trigger) + len(tag.response) + 8
-                > DISCORD_EMBED_LIMIT
-            ):
-                pages.append(Page(embeds=[buffer]))
-                buffer = discord.Embed(title="Tags", color=discord.Color.blue())
-            buffer.add_field(name=f"`{tag.trigger}`", value=tag.response, inline=False)
-        pages.append(Page(embeds=[buffer]))
-
-        paginator = Paginator(pages=pages, loop_pages=True)
+        async def render(page_number):
+            # keyset pagination: each page is the tag ID range up to the next start
+            tags = Tag.filter(tag_id__gte=starts[page_number])
+            if page_number + 1 < len(starts):
+                tags = tags.filter(tag_id__lt=starts[page_number + 1])
+            tags = await tags.order_by("tag_id").limit(TAGS_PER_PAGE)
+            return tag_page("Tags", discord.Color.blue(), tags)
+
+        paginator = LazyPaginator(len(starts), render, loop_pages=True)
         await paginator.respond(ctx.interaction)
 
     @tag.command(name="search")
-    async def search_tags(self, ctx, query: str):
+    @discord.option(
+        "regex",
+        bool,
+        description=f"Use a regular expression (slower, first {REGEX_SCAN_LIMIT} tags)",
+        required=False,
+        default=False,
+    )
+    async def search_tags(self, ctx, query: str, regex: bool):
         """Search for tags by trigger or response."""
-        tags = await Tag.all()
-        tags = [
-            tag
-            for tag in tags
-            if re.search(query, tag.trigger) or re.search(query, tag.response)
-        ]
-        if not tags:
+        if regex:
+            try:
+                pattern = re.compile(query)
+            except re.error as e:
+                await ctx.respond(f"Invalid regular expression `{query}`: {e}")
+                return
+            await ctx.defer()
+            try:
+                tag_ids = await regex_search_tag_ids(
+                    self.search_worker, pattern.pattern
+                )
+            except (TimeoutError, WorkerError):
+                await ctx.respond(f"Searching for `{query}` took too long.")
+                return
+        else:
+            tag_ids = await search_tag_ids(query)
+        if not tag_ids:
             await ctx.respond(f"No tags found matching `{query}`.")
             return
 
-        pages = []
-        buffer = discord.Embed(
-            title=f"Search results for '{query}'", color=discord.Color.green()
-        )
-        for tag in tags:
-            if (
-                len(buffer) + len(tag.trigger) + len(tag.response) + 8
-                > DISCORD_EMBED_LIMIT
-            ):
-                pages.append(Page(embeds=[buffer]))
-                buffer = discord.Embed(
-                    title=f"Search results for '{query}'", color=discord.Color.green()
-                )
-            buffer.add_field(name=f"`{tag.trigger}`", value=tag.response, inline=False)
-        pages.append(Page(embeds=[buffer]))
+        async def render(page_number):
+            start = page_number * TAGS_PER_PAGE
+            tags = await fetch_tags(tag_ids[start : start + TAGS_PER_PAGE])
+            return tag_page(
+                f"Search results for '{query}'", discord.Color.green(), tags
+            )
 
-        paginator = Paginator(pages=pages, loop_pages=True)
+        page_count = -(-len(tag_ids) // TAGS_PER_PAGE)
+        paginator = LazyPaginator(page_count, render, loop_pages=True)
         await paginator.respond(ctx.interaction)
 
     @commands.Cog.listener()
@@ -99,11 +240,10 @@ class Tags(commands.Cog):
         if message.author.bot:
             return
 
-        tags = await Tag.all()
-        for tag in tags:
-            if re.fullmatch(tag.trigger, message.content, re.DOTALL | re.IGNORECASE):
-                await message.channel.send(tag.response)
-                return
+        await self.triggers.ensure_loaded()
+        response = await self.triggers.match(message.content)
+        if response is not None:
+            await message.channel.send(response)
 
 
 def setup(bot):
@@ -1,15 +1,46 @@
+import asyncio
+import contextlib
 import logging
 import os
+from datetime import timedelta
 
 import discord
 from discord.ext import commands, tasks
-from discord.ext.pages import Page, Paginator
+from discord.ext.pages import Page
 
+from ..db.lookups import LookupCache, index_words, is_suggestions, normalize
+from ..db.quota import QuotaManager
+from ..util.http import SharedSession
+from ..util.lru import LRUCache
 from ..util.merweb import ICON, MerWebWrapper, mw_dict_link, processed
+from ..util.pages import LazyPaginator, StreamingPaginator
+from ..util.paths import DATA_DIR
+from ..util.prefix import PrefixIndex
+from ..util.singleflight import SingleFlight
+from ..util.spelling import SpellIndex
 
 logger = logging.getLogger(__name__)
 
 
+# can point at a local stand-in, see benchmarks/mwserver.py
+BASE_URL = os.getenv("MWD_BASE_URL", "https://dictionaryapi.com/api/v3/references")
+
+RENDERED_CACHE_SIZE = 1024
+
+DAILY_LIMIT = 500
+
+# near the end of each quota window, leftover requests (minus a reserve for
+# users) prefetch the words listed in this file, one word per line
+WARM_BEFORE = timedelta(hours=1)
+WARM_RESERVE = int(os.getenv("MWD_WARM_RESERVE", 25))
+WARM_WORDS_PATH = str(DATA_DIR / "words" / "{dictionary}.txt")
+
+# /definemany looks up this many words at most, and all batches together wait
+# on at most BATCH_CONCURRENCY uncached lookups at a time
+MAX_BATCH_WORDS = 10
+BATCH_CONCURRENCY = int(os.getenv("MWD_BATCH_CONCURRENCY", 4))
+
+
 # definition line
 def def_ln(sn: str, dt: str) -> str:
     if not dt:
@@ -24,7 +55,8 @@ def def_ln(sn: str, dt: str) -> str:
     return f"**`{indent}{sn}`**{dt}"
 
 
-def extract_page_from_entry(entry):
+def render_entry(entry):
+    """Return the page text, embed description and embed fields for an entry."""
     # basic info
     word = entry["hwi"]["hw"].replace("*", "")
     fl = f" ({entry['fl']})" if "fl" in entry else ""
@@ -75,81 +107,341 @@ def extract_page_from_entry(entry):
                                     break
         lines.append("")
 
-    # construct embed
-    embed = discord.Embed(
-        color=discord.Color.blue(),
-        description=description,
-        timestamp=discord.utils.utcnow(),
-        footer=discord.EmbedFooter(
-            text="Data from Merriam-Webster",
-            icon_url=ICON,
-        ),
-    )
+    fields = []
 
     # add etymology field
     if "et" in entry:
         et_text = "\n".join(item[1] for item in entry["et"] if item[0] == "text")
-        embed.add_field(
-            name="Etymology",
-            value=processed(et_text),
-            inline=False,
-        )
+        fields.append(("Etymology", processed(et_text)))
 
     # add first known use field
     if "date" in entry:
-        embed.add_field(
-            name="First Known Use",
-            value=processed(entry["date"]),
-            inline=False,
-        )
+        fields.append(("First Known Use", processed(entry["date"])))
 
     text = processed("\n".join(lines))
     if len(text) > 2000:
         end = "\n-# ...(truncated)"
         text = text[: 2000 - len(end)] + end
+    return text, description, fields
+
+
+def build_page(text: str, description: str, fields: list[tuple[str, str]]) -> Page:
+    embed = discord.Embed(
+        color=discord.Color.blue(),
+        description=description,
+        timestamp=discord.utils.utcnow(),
+        footer=discord.EmbedFooter(
+            text="Data from Merriam-Webster",
+            icon_url=ICON,
+        ),
+    )
+    for name, value in fields:
+        embed.add_field(name=name, value=value, inline=False)
     return Page(content=text, embeds=[embed])
 
 
+def notice_page(text: str) -> Page:
+    return Page(embeds=[discord.Embed(description=text, color=discord.Color.red())])
+
+
+def read_lines(path: str) -> list[str]:
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def read_word_list(dictionary: str) -> list[str]:
+    """Return the bundled word list of a dictionary, if there is one."""
+    path = os.getenv(
+        f"MWD_{dictionary.upper()}_WARM_WORDS",
+        WARM_WORDS_PATH.format(dictionary=dictionary),
+    )
+    try:
+        return read_lines(path)
+    except FileNotFoundError:
+        return []
+
+
+def read_lexicon(dictionary: str) -> list[str]:
+    """Return the full word list set for a dictionary's spelling check, if any.
+
+    The path is read from `MWD_<DICTIONARY>_LEXICON`, e.g. /usr/share/dict/words.
+    """
+    path = os.getenv(f"MWD_{dictionary.upper()}_LEXICON")
+    if not path:
+        return []
+    try:
+        return read_lines(path)
+    except FileNotFoundError:
+        logger.warning(f"Lexicon {path} for the {dictionary} dictionary not found.")
+        return []
+
+
+async def complete_collegiate(ctx: discord.AutocompleteContext):
+    return ctx.cog.headwords["collegiate"].complete(ctx.value or "")
+
+
+async def complete_medical(ctx: discord.AutocompleteContext):
+    return ctx.cog.headwords["medical"].complete(ctx.value or "")
+
+
 class Words(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.http = SharedSession()
         self.mw_collegiate = MerWebWrapper(
-            "https://dictionaryapi.com/api/v3/references/collegiate/json",
+            f"{BASE_URL}/collegiate/json",
             os.getenv("MWD_COLLEGIATE_API_KEY"),
+            self.http,
         )
         self.mw_medical = MerWebWrapper(
-            "https://dictionaryapi.com/api/v3/references/medical/json",
+            f"{BASE_URL}/medical/json",
             os.getenv("MWD_MEDICAL_API_KEY"),
+            self.http,
         )
 
-        # limit to 500 requests per day
-        self.mw_collegiate_counter = 0
-        self.mw_medical_counter = 0
+        self.dictionaries = {
+            "collegiate": self.mw_collegiate,
+            "medical": self.mw_medical,
+        }
 
-    @discord.slash_command(name="define", description="Get the definition of a word")
-    async def define_word(self, ctx, query: str):
-        """Fetch and display the definition of a word from Merriam-Webster."""
-        if self.mw_collegiate_counter >= 500:
-            logger.warning(
-                f"Daily request limit reached for collegiate dictionary. {self.mw_collegiate_counter = }"
+        # responses are cached so repeated lookups do not use up the quota
+        self.cache = LookupCache()
+        self.inflight = SingleFlight()
+        self.batch_slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+        # rendered entries by `meta.uuid`; only the embed timestamp is redone
+        self.rendered = LRUCache(RENDERED_CACHE_SIZE)
+
+        # headwords for autocomplete, from the word lists and cached responses
+        self.headwords = {name: PrefixIndex() for name in self.dictionaries}
+        # known words for offline "did you mean" answers, which cost no quota;
+        # only dictionaries with a full lexicon get them, since with a partial
+        # one any unlisted word would look like a typo
+        self.spelling = {}
+        self.words_loaded = False
+
+        # limit to 500 requests per day, counted in the database
+        self.quota = QuotaManager(DAILY_LIMIT)
+        self.last_purge = None
+
+    async def cog_setup(self):
+        """Index the word lists and lexicons, which can be large, in a thread."""
+        for name in self.dictionaries:
+            words = await asyncio.to_thread(read_word_list, name)
+            self.headwords[name].update(words)
+            if lexicon := await asyncio.to_thread(read_lexicon, name):
+                self.spelling[name] = await asyncio.to_thread(SpellIndex, lexicon)
+
+    async def cog_teardown(self):
+        await self.http.close()
+
+    def cog_unload(self):
+        self.maintain_cache.cancel()
+        self.inflight.cancel()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if not self.maintain_cache.is_running():
+            self.maintain_cache.start()
+        # on_ready fires again after every reconnect
+        if not self.words_loaded:
+            self.words_loaded = True
+            await self.load_words()
+
+    async def load_words(self):
+        """Add the words of every stored lookup to the local indexes."""
+        found = {name: ([], []) for name in self.dictionaries}
+        for dictionary, hws, known in await self.cache.words():
+            if dictionary in found:
+                found[dictionary][0].extend(hws)
+                found[dictionary][1].extend(known)
+
+        for name, (hws, known) in found.items():
+            self.headwords[name].update(hws)
+            # the spelling index is the slow one to extend
+            if (spelling := self.spelling.get(name)) is not None:
+                await asyncio.to_thread(spelling.update, known)
+        headword_counts = {name: len(index) for name, index in self.headwords.items()}
+        known_counts = {name: len(index) for name, index in self.spelling.items()}
+        logger.info(
+            f"Indexed headwords: {headword_counts}, known words: {known_counts}"
+        )
+
+    def learn(self, dictionary: str, query: str, response):
+        """Add the words an API response shows to exist to the local indexes."""
+        hws, known = index_words(query, response)
+        self.headwords[dictionary].update(hws)
+        if (spelling := self.spelling.get(dictionary)) is not None:
+            spelling.update(known)
+
+    async def suggest(self, dictionary: str, query: str) -> list[str]:
+        """Return local corrections for a query that is not a known word.
+
+        Queries with a cached response get none, so the cached answer wins.
+        """
+        if dictionary not in self.spelling:
+            return []
+        suggestions = self.spelling[dictionary].suggest(query)
+        if suggestions and await self.cache.get(dictionary, query) is None:
+            return suggestions
+        return []
+
+    async def lookup(self, dictionary: str, query: str, slots=None):
+        """Return the API response for a query, or None if over the daily limit.
+
+        With `slots`, a semaphore is held while waiting on the API.
+        """
+        response = await self.cache.get(dictionary, query)
+        if response is not None:
+            logger.debug(f"Cache hit for {query!r} in the {dictionary} dictionary.")
+            return response
+
+        # users looking up the same word at the same time share one request
+        async with slots or contextlib.nullcontext():
+            return await self.inflight.do(
+                (dictionary, normalize(query)), lambda: self.fetch(dictionary, query)
+            )
+
+    async def fetch(self, dictionary: str, query: str):
+        if not await self.quota.acquire(f"mw_{dictionary}"):
+            logger.warning(f"Daily request limit reached for {dictionary} dictionary.")
+            return None
+        response = await self.dictionaries[dictionary].fetch(query)
+        await self.cache.put(dictionary, query, response)
+        self.learn(dictionary, query, response)
+        return response
+
+    async def define(self, ctx, dictionary: str, query: str, exact: bool = False):
+        # likely typos are answered from the local word list unless `exact`
+        if not exact and (suggestions := await self.suggest(dictionary, query)):
+            logger.debug(f"Suggested {suggestions} for {query!r} without a request.")
+            await ctx.respond(
+                embed=discord.Embed(
+                    description=f"No exact match found for {query}. "
+                    f"*Did you mean: {', '.join(suggestions)}?*\n"
+                    "-# Set `exact` to look it up in the dictionary anyway.",
+                    color=discord.Color.red(),
+                )
             )
-            await ctx.respond("Daily request limit reached for collegiate dictionary.")
             return
-        self.mw_collegiate_counter += 1
-        response = await self.mw_collegiate.fetch(query)
-        await self.handle_response(ctx, query, response)
+
+        response = await self.lookup(dictionary, query)
+        if response is None:
+            await ctx.respond(
+                f"Daily request limit reached for {dictionary} dictionary."
+            )
+        else:
+            await self.handle_response(ctx, query, response)
+
+    @discord.slash_command(name="define", description="Get the definition of a word")
+    @discord.option(
+        "query", str, description="Word to look up", autocomplete=complete_collegiate
+    )
+    @discord.option(
+        "exact",
+        bool,
+        description="Skip the spelling check and always ask the dictionary",
+        required=False,
+        default=False,
+    )
+    async def define_word(self, ctx, query: str, exact: bool):
+        """Fetch and display the definition of a word from Merriam-Webster."""
+        await self.define(ctx, "collegiate", query, exact)
 
     @discord.slash_command(
         name="meddefine", description="Get the medical definition of a word"
     )
-    async def meddefine_word(self, ctx, query: str):
+    @discord.option(
+        "query", str, description="Word to look up", autocomplete=complete_medical
+    )
+    @discord.option(
+        "exact",
+        bool,
+        description="Skip the spelling check and always ask the dictionary",
+        required=False,
+        default=False,
+    )
+    async def meddefine_word(self, ctx, query: str, exact: bool):
         """Fetch and display the medical definition of a word from Merriam-Webster."""
-        if self.mw_medical_counter >= 500:
-            await ctx.respond("Daily request limit reached for medical dictionary.")
+        await self.define(ctx, "medical", query, exact)
+
+    @discord.slash_command(
+        name="definemany", description="Get the definitions of several words at once"
+    )
+    @discord.option(
+        "words",
+        str,
+        description=f"Up to {MAX_BATCH_WORDS} words or phrases separated by commas",
+    )
+    @discord.option(
+        "dictionary",
+        str,
+        description="Dictionary to use (default collegiate)",
+        choices=["collegiate", "medical"],
+        required=False,
+        default="collegiate",
+    )
+    @discord.option(
+        "exact",
+        bool,
+        description="Skip the spelling check and always ask the dictionary",
+        required=False,
+        default=False,
+    )
+    async def define_many(self, ctx, words: str, dictionary: str, exact: bool):
+        """Look up several words concurrently, one page per word."""
+        queries = {normalize(word): " ".join(word.split()) for word in words.split(",")}
+        queries.pop("", None)
+        queries = list(queries.values())
+        if not 1 <= len(queries) <= MAX_BATCH_WORDS:
+            await ctx.respond(
+                f"Give between 1 and {MAX_BATCH_WORDS} words separated by commas.",
+                ephemeral=True,
+            )
             return
-        self.mw_medical_counter += 1
-        response = await self.mw_medical.fetch(query)
-        await self.handle_response(ctx, query, response)
+
+        # every page is shown as soon as its word is resolved
+        paginator = StreamingPaginator(
+            [Page(content=f"Looking up **{query}**…") for query in queries]
+        )
+        await paginator.respond(ctx.interaction)
+
+        async def resolve(page_number: int, query: str):
+            try:
+                page = await self.word_page(dictionary, query, exact)
+            except Exception as e:
+                logger.error(f"Failed to look up {query!r}.", exc_info=e)
+                page = notice_page(f"Could not look up {query}.")
+            await paginator.set_page(page_number, page)
+
+        await asyncio.gather(
+            *(resolve(page_number, query) for page_number, query in enumerate(queries))
+        )
+
+    async def word_page(self, dictionary: str, query: str, exact: bool) -> Page:
+        """Return the page for one word of /definemany: its first defined entry."""
+        if not exact and (suggestions := await self.suggest(dictionary, query)):
+            return notice_page(
+                f"No exact match found for {query}. "
+                f"*Did you mean: {', '.join(suggestions)}?*"
+            )
+
+        response = await self.lookup(dictionary, query, self.batch_slots)
+        if response is None:
+            return notice_page(
+                f"Daily request limit reached for {dictionary} dictionary."
+            )
+        if not response:
+            return notice_page(f"No definitions found for {query}.")
+        if is_suggestions(response):
+            return notice_page(
+                f"No exact match found for {query}. "
+                f"*Did you mean: {', '.join(response)}?*"
+            )
+        for entry in response:
+            if "def" in entry:
+                return self.entry_page(entry)
+        return notice_page(f"No definitions found for {query}.")
 
     async def handle_response(self, ctx, query, response):
         if not response:
@@ -171,17 +463,70 @@ class Words(commands.Cog):
             )
             return
 
-        pages = []
-        for entry in response:
-            if page := extract_page_from_entry(entry):
-                pages.append(page)
-        paginator = Paginator(pages)
+        # only entries with definitions get a page, and each page is rendered
+        # when it is first shown
+        entries = [entry for entry in response if "def" in entry]
+        if not entries:
+            await ctx.respond(
+                embed=discord.Embed(
+                    description=f"No definitions found for {query}.",
+                    color=discord.Color.red(),
+                )
+            )
+            return
+
+        async def render(page_number):
+            return self.entry_page(entries[page_number])
+
+        paginator = LazyPaginator(len(entries), render)
         await paginator.respond(ctx.interaction)
 
-    @tasks.loop(hours=24)
-    async def reset_counters(self):
-        self.mw_collegiate_counter = 0
-        self.mw_medical_counter = 0
+    def entry_page(self, entry) -> Page:
+        """Build the page for an entry, reusing its rendered text if cached."""
+        uuid = entry.get("meta", {}).get("uuid")
+        rendered = self.rendered.get(uuid) if uuid else None
+        if rendered is None:
+            rendered = render_entry(entry)
+            if uuid:
+                self.rendered.put(uuid, rendered)
+        return build_page(*rendered)
+
+    @tasks.loop(minutes=15)
+    async def maintain_cache(self):
+        # drop expired entries once per quota window
+        window = self.quota.window_start()
+        if self.last_purge != window:
+            await self.cache.purge()
+            self.last_purge = window
+
+        # spend quota that would otherwise go unused on common words
+        if self.quota.window_end() - discord.utils.utcnow() <= WARM_BEFORE:
+            for dictionary in self.dictionaries:
+                await self.warm_cache(dictionary)
+
+    async def warm_cache(self, dictionary: str):
+        """Prefetch words from the dictionary's word list with leftover quota."""
+        words = read_word_list(dictionary)
+        if not words:
+            return
+
+        budget = await self.quota.remaining(f"mw_{dictionary}") - WARM_RESERVE
+        if budget <= 0:
+            return
+        fetched = 0
+        for word in (await self.cache.missing(dictionary, words))[:budget]:
+            try:
+                response = await self.inflight.do(
+                    (dictionary, normalize(word)), lambda: self.fetch(dictionary, word)
+                )
+            except Exception as e:
+                logger.error(f"Failed to prefetch {word!r}.", exc_info=e)
+                break
+            if response is None:
+                break
+            fetched += 1
+        if fetched:
+            logger.info(f"Prefetched {fetched} word(s) into the {dictionary} cache.")
 
 
 def setup(bot):
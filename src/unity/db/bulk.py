@@ -0,0 +1,145 @@
+import json
+import logging
+from collections.abc import Awaitable, Callable
+from typing import IO
+
+from tortoise.transactions import in_transaction
+
+from .models import Tag
+
+logger = logging.getLogger(__name__)
+
+
+BATCH_SIZE = 500
+CONFLICT_MODES = ["skip", "overwrite", "fail"]
+
+
+class TagConflictError(Exception):
+    def __init__(self, trigger: str):
+        super().__init__(f"A tag with trigger `{trigger}` already exists.")
+        self.trigger = trigger
+
+
+async def export_tags(fp: IO[bytes], batch_size: int = BATCH_SIZE) -> int:
+    """Write every tag to `fp` as JSON lines, reading the table in batches."""
+    count = 0
+    last = 0
+    while True:
+        rows = (
+            await Tag.filter(tag_id__gt=last)
+            .order_by("tag_id")
+            .limit(batch_size)
+            .values("tag_id", "trigger", "response", "disabled")
+        )
+        if not rows:
+            break
+        for row in rows:
+            record = {"trigger": row["trigger"], "response": row["response"]}
+            if row["disabled"]:
+                record["disabled"] = True
+            fp.write(json.dumps(record, ensure_ascii=False).encode() + b"\n")
+        count += len(rows)
+        last = rows[-1]["tag_id"]
+    return count
+
+
+def parse_line(line: bytes) -> dict | None:
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, dict):
+        return None
+    trigger, response = record.get("trigger"), record.get("response")
+    if not isinstance(trigger, str) or not isinstance(response, str):
+        return None
+    if not trigger or len(trigger) > 2000 or len(response) > 2000:
+        return None
+    return {
+        "trigger": trigger,
+        "response": response,
+        "disabled": bool(record.get("disabled", False)),
+    }
+
+
+async def import_tags(
+    fp: IO[bytes],
+    on_conflict: str = "skip",
+    validate: Callable[[str], Awaitable[bool]] | None = None,
+    batch_size: int = BATCH_SIZE,
+) -> dict[str, int]:
+    """Import tags from a JSON lines file in a single transaction.
+
+    `on_conflict` decides what happens to triggers that already exist: "skip"
+    keeps the stored tag, "overwrite" replaces its response and "fail" raises
+    `TagConflictError` and rolls the whole import back. Lines that are not a
+    valid tag, or whose trigger fails `validate`, are counted as invalid.
+
+    Every line is validated before the transaction starts, since validation
+    can be slow; the file is then read a second time for the writes.
+    """
+    if on_conflict not in CONFLICT_MODES:
+        raise ValueError(f"Unknown conflict mode: {on_conflict}")
+
+    stats = {"created": 0, "updated": 0, "skipped": 0, "invalid": 0}
+    valid = set()
+    for number, line in enumerate(fp, start=1):
+        if not line.strip():
+            continue
+        record = parse_line(line)
+        if record is None or (validate and not await validate(record["trigger"])):
+            logger.debug(f"Skipping invalid tag on line {number}.")
+            stats["invalid"] += 1
+            continue
+        valid.add(number)
+
+    fp.seek(0)
+    async with in_transaction() as connection:
+
+        async def flush(batch: dict[str, dict]):
+            existing = await Tag.filter(trigger__in=list(batch)).using_db(connection)
+            updated = []
+            for tag in existing:
+                if on_conflict == "fail":
+                    raise TagConflictError(tag.trigger)
+                record = batch.pop(tag.trigger)
+                if on_conflict == "skip":
+                    stats["skipped"] += 1
+                    continue
+                tag.response = record["response"]
+                tag.disabled = record["disabled"]
+                updated.append(tag)
+
+            if updated:
+                await Tag.bulk_update(
+                    updated, fields=["response", "disabled"], using_db=connection
+                )
+            if batch:
+                await Tag.bulk_create(
+                    [Tag(**record) for record in batch.values()], using_db=connection
+                )
+            stats["updated"] += len(updated)
+            stats["created"] += len(batch)
+
+        batch = {}
+        for number, line in enumerate(fp, start=1):
+            if number not in valid:
+                continue
+            record = parse_line(line)
+
+            # repeated triggers within the file conflict like stored ones
+            if record["trigger"] in batch:
+                if on_conflict == "fail":
+                    raise TagConflictError(record["trigger"])
+                if on_conflict == "skip":
+                    stats["skipped"] += 1
+                    continue
+            batch[record["trigger"]] = record
+            if len(batch) >= batch_size:
+                await flush(batch)
+                batch = {}
+        if batch:
+            await flush(batch)
+
+    logger.info(f"Imported tags: {stats}")
+    return stats
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from tortoise.exceptions import IntegrityError
+
+from ..util.lru import LRUCache
+from .models import DictionaryEntry
+
+logger = logging.getLogger(__name__)
+
+
+MEMORY_SIZE = 512
+
+# entries rarely change; "did you mean" lists change as the dictionary grows
+ENTRY_TTL = timedelta(days=30)
+SUGGESTION_TTL = timedelta(days=7)
+
+# longer queries are looked up as usual but not stored
+MAX_QUERY_LENGTH = 255
+
+
+def normalize(query: str) -> str:
+    return " ".join(query.split()).lower()
+
+
+def is_suggestions(response) -> bool:
+    """Whether an API response is a list of suggested words rather than entries."""
+    return not response or isinstance(response[0], str)
+
+
+def headwords(response) -> list[str]:
+    """Return the headwords of the entries in an API response."""
+    if is_suggestions(response):
+        return []
+    words = []
+    for entry in response:
+        if hw := entry.get("hwi", {}).get("hw"):
+            words.append(hw.replace("*", ""))
+        if entry_id := entry.get("meta", {}).get("id"):
+            words.append(entry_id.split(":")[0])
+    return words
+
+
+def known_words(response) -> list[str]:
+    """Return the words an API response shows to exist.
+
+    That is the headwords and inflections of its entries, or the words of a
+    "did you mean" list.
+    """
+    if is_suggestions(response):
+        return list(response)
+    words = headwords(response)
+    for entry in response:
+        words.extend(entry.get("meta", {}).get("stems", []))
+    return words
+
+
+def index_words(query: str, response) -> tuple[list[str], list[str]]:
+    """Return the headwords and known words to index for a stored lookup.
+
+    A query that found entries is a known word itself.
+    """
+    known = known_words(response)
+    if not is_suggestions(response):
+        known.append(query)
+    return list(dict.fromkeys(headwords(response))), list(dict.fromkeys(known))
+
+
+class LookupCache:
+    """Dictionary API responses cached in memory and in the database.
+
+    Keys are the dictionary name and the normalized query. Recently used
+    responses are kept in an in-process LRU in front of the database table,
+    which keeps them across restarts until they expire.
+    """
+
+    def __init__(
+        self,
+        size: int = MEMORY_SIZE,
+        entry_ttl: timedelta = ENTRY_TTL,
+        suggestion_ttl: timedelta = SUGGESTION_TTL,
+    ):
+        self.memory = LRUCache(size)
+        self.entry_ttl = entry_ttl
+        self.suggestion_ttl = suggestion_ttl
+
+    def ttl(self, response) -> timedelta:
+        return self.suggestion_ttl if is_suggestions(response) else self.entry_ttl
+
+    async def get(self, dictionary: str, query: str):
+        """Return the cached response for a query, or None on a miss."""
+        key = (dictionary, normalize(query))
+        now = datetime.now(timezone.utc)
+        if cached := self.memory.get(key):
+            expires, response = cached
+            if expires > now:
+                return response
+            self.memory.pop(key)
+
+        if len(key[1]) > MAX_QUERY_LENGTH:
+            return None
+        row = await DictionaryEntry.get_or_none(dictionary=key[0], query=key[1])
+        if row is None:
+            return None
+        expires = row.fetched_at + self.ttl(row.response)
+        if expires <= now:
+            return None
+        self.memory.put(key, (expires, row.response))
+        return row.response
+
+    async def put(self, dictionary: str, query: str, response):
+        key = (dictionary, normalize(query))
+        now = datetime.now(timezone.utc)
+        self.memory.put(key, (now + self.ttl(response), response))
+
+        if len(key[1]) > MAX_QUERY_LENGTH:
+            return
+        hws, known = index_words(query, response)
+        values = dict(
+            response=response, fetched_at=now, headwords=hws, known_words=known
+        )
+        updated = await DictionaryEntry.filter(dictionary=key[0], query=key[1]).update(
+            **values
+        )
+        if not updated:
+            try:
+                await DictionaryEntry.create(dictionary=key[0], query=key[1], **values)
+            except IntegrityError:
+                # stored by a concurrent lookup of the same query
+                pass
+
+    async def missing(self, dictionary: str, queries: list[str]) -> list[str]:
+        """Return the queries that have no fresh stored response."""
+        now = datetime.now(timezone.utc)
+        keys = {normalize(query): query for query in queries}
+        stored = await DictionaryEntry.filter(
+            dictionary=dictionary, query__in=list(keys)
+        ).values_list("query", "response", "fetched_at")
+        fresh = {
+            query
+            for query, response, fetched_at in stored
+            if fetched_at + self.ttl(response) > now
+        }
+        return [query for key, query in keys.items() if key not in fresh]
+
+    async def words(self) -> list[tuple[str, list[str], list[str]]]:
+        """Return the dictionary, headwords and known words of every stored lookup."""
+        await self.fill_words()
+        return await DictionaryEntry.all().values_list(
+            "dictionary", "headwords", "known_words"
+        )
+
+    async def fill_words(self, batch: int = 500):
+        """Extract the words of lookups stored before they were kept, once."""
+        filled = 0
+        while (
+            rows := await DictionaryEntry.filter(headwords__isnull=True)
+            .limit(batch)
+            .values_list("id", "query", "response")
+        ):
+            words = await asyncio.to_thread(
+                lambda: [index_words(query, response) for _, query, response in rows]
+            )
+            for (row_id, _, _), (hws, known) in zip(rows, words):
+                await DictionaryEntry.filter(id=row_id).update(
+                    headwords=hws, known_words=known
+                )
+            filled += len(rows)
+        if filled:
+            logger.info(f"Extracted the words of {filled} stored dictionary entries.")
+
+    async def purge(self) -> int:
+        """Delete stored responses that have expired."""
+        now = datetime.now(timezone.utc)
+        # suggestions expire first, so anything older than that may be stale
+        stale = await DictionaryEntry.filter(
+            fetched_at__lt=now - min(self.entry_ttl, self.suggestion_ttl)
+        )
+        expired = [
+            row.id for row in stale if row.fetched_at + self.ttl(row.response) <= now
+        ]
+        if expired:
+            await DictionaryEntry.filter(id__in=expired).delete()
+            logger.info(f"Purged {len(expired)} expired dictionary entries.")
+        return len(expired)
@@ -6,3 +6,44 @@ class Tag(Model):
     tag_id = fields.IntField(pk=True)
     trigger = fields.CharField(max_length=2000, unique=True)
     response = fields.CharField(max_length=2000)
+    disabled = fields.BooleanField(default=False)
+
+
+class Game24Stats(Model):
+    id = fields.IntField(pk=True)
+    guild_id = fields.BigIntField()
+    user_id = fields.BigIntField(db_index=True)
+    solves = fields.IntField(default=0)
+    total_time = fields.FloatField(default=0)
+    best_time = fields.FloatField(null=True)
+    best_streak = fields.IntField(default=0)
+
+    class Meta:
+        table = "game24_stats"
+        unique_together = (("guild_id", "user_id"),)
+
+
+class DictionaryEntry(Model):
+    id = fields.IntField(pk=True)
+    dictionary = fields.CharField(max_length=32)
+    query = fields.CharField(max_length=255)
+    response = fields.JSONField()
+    fetched_at = fields.DatetimeField()
+    # taken from the response when stored, so the word indexes can be
+    # rebuilt without loading every response
+    headwords = fields.JSONField(null=True)
+    known_words = fields.JSONField(null=True)
+
+    class Meta:
+        table = "dictionary_entry"
+        unique_together = (("dictionary", "query"),)
+
+
+class ApiQuota(Model):
+    id = fields.IntField(pk=True)
+    name = fields.CharField(max_length=32, unique=True)
+    window_start = fields.DatetimeField()
+    used = fields.IntField(default=0)
+
+    class Meta:
+        table = "api_quota"
@@ -0,0 +1,67 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+from tortoise.exceptions import IntegrityError
+from tortoise.expressions import F
+
+from .models import ApiQuota
+
+logger = logging.getLogger(__name__)
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class QuotaManager:
+    """Request quotas stored in the database, shared by every bot process.
+
+    Each named quota allows `limit` requests per fixed UTC window (midnight
+    to midnight by default). Requests are counted with conditional updates,
+    so concurrent processes cannot go over the limit together.
+    """
+
+    def __init__(self, limit: int = 500, window: timedelta = timedelta(days=1)):
+        self.limit = limit
+        self.window = window
+
+    def window_start(self, now: datetime | None = None) -> datetime:
+        now = now or datetime.now(timezone.utc)
+        return EPOCH + (now - EPOCH) // self.window * self.window
+
+    def window_end(self, now: datetime | None = None) -> datetime:
+        return self.window_start(now) + self.window
+
+    async def _current(self, name: str, start: datetime):
+        # start a new window for quotas whose last one has ended
+        await ApiQuota.filter(name=name, window_start__lt=start).update(
+            window_start=start, used=0
+        )
+        if not await ApiQuota.exists(name=name):
+            try:
+                await ApiQuota.create(name=name, window_start=start, used=0)
+            except IntegrityError:
+                # created by another process in the meantime
+                pass
+
+    async def acquire(self, name: str) -> bool:
+        """Count one request against a quota, or return False if it is used up."""
+        start = self.window_start()
+        for _ in range(2):
+            acquired = await ApiQuota.filter(
+                name=name, window_start=start, used__lt=self.limit
+            ).update(used=F("used") + 1)
+            if acquired:
+                return True
+            if await ApiQuota.exists(name=name, window_start=start):
+                logger.warning(f"Request quota {name!r} is used up for this window.")
+                return False
+            await self._current(name, start)
+        return False
+
+    async def used(self, name: str) -> int:
+        start = self.window_start()
+        row = await ApiQuota.get_or_none(name=name)
+        return row.used if row is not None and row.window_start >= start else 0
+
+    async def remaining(self, name: str) -> int:
+        return max(self.limit - await self.used(name), 0)
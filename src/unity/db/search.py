@@ -0,0 +1,109 @@
+import re
+
+from tortoise import Tortoise
+from tortoise.expressions import Q
+
+from ..util.callworker import CallWorker
+from .models import Tag
+
+SEARCH_LIMIT = 100
+
+# regex searches run in a worker process, over at most this many tags
+REGEX_SCAN_LIMIT = 5000
+REGEX_SEARCH_TIMEOUT = 2
+
+
+def fts_query(query: str) -> str:
+    """Turn free text into an FTS5 query matching every word as a prefix."""
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", query))
+
+
+async def search_tag_ids(query: str, limit: int = SEARCH_LIMIT) -> list[int]:
+    """Return the IDs of the tags best matching a plain-text query, best first.
+
+    Uses the full-text index created by the `tag_search` migration.
+    """
+    connection = Tortoise.get_connection("default")
+    dialect = connection.capabilities.dialect
+
+    if dialect == "sqlite":
+        match = fts_query(query)
+        if not match:
+            return []
+        # triggers weigh more than responses
+        _, rows = await connection.execute_query(
+            'SELECT rowid FROM "tag_fts" WHERE "tag_fts" MATCH ? '
+            'ORDER BY bm25("tag_fts", 2.0, 1.0) LIMIT ?',
+            [match, limit],
+        )
+        return [row[0] for row in rows]
+
+    if dialect == "postgres":
+        _, rows = await connection.execute_query(
+            'SELECT "tag_id" FROM "tag", plainto_tsquery(\'simple\', $1) AS q '
+            'WHERE "search" @@ q OR "trigger" % $1 '
+            'ORDER BY ts_rank("search", q) + similarity("trigger", $1) DESC, "tag_id" '
+            "LIMIT $2",
+            [query, limit],
+        )
+        return [row[0] for row in rows]
+
+    # no full-text index for other backends, fall back to substring matching
+    return (
+        await Tag.filter(Q(trigger__icontains=query) | Q(response__icontains=query))
+        .order_by("tag_id")
+        .limit(limit)
+        .values_list("tag_id", flat=True)
+    )
+
+
+def regex_matches(source: str, rows: list[tuple], limit: int) -> list[int]:
+    """Return the IDs of the rows whose trigger or response the pattern finds.
+
+    Kept at module level so it can be sent to a worker process.
+    """
+    pattern = re.compile(source)
+    tag_ids = []
+    for tag_id, trigger, response in rows:
+        if pattern.search(trigger) or pattern.search(response):
+            tag_ids.append(tag_id)
+            if len(tag_ids) == limit:
+                break
+    return tag_ids
+
+
+async def regex_search_tag_ids(
+    worker: CallWorker, query: str, limit: int = SEARCH_LIMIT
+) -> list[int]:
+    """Return the IDs of the tags matching a regular expression, by tag ID.
+
+    The pattern runs in `worker`, which raises TimeoutError if it takes longer
+    than `REGEX_SEARCH_TIMEOUT`, and only the first `REGEX_SCAN_LIMIT` tags are
+    searched.
+    """
+    rows = (
+        await Tag.all()
+        .order_by("tag_id")
+        .limit(REGEX_SCAN_LIMIT)
+        .values_list("tag_id", "trigger", "response")
+    )
+    return await worker.call(
+        regex_matches, query, rows, limit, timeout=REGEX_SEARCH_TIMEOUT
+    )
+
+
+async def fetch_tags(tag_ids: list[int]) -> list[Tag]:
+    """Fetch tags by ID, keeping the order of the given IDs."""
+    tags = {tag.tag_id: tag for tag in await Tag.filter(tag_id__in=tag_ids)}
+    return [tags[tag_id] for tag_id in tag_ids if tag_id in tags]
+
+
+async def page_start_ids(page_size: int) -> list[int]:
+    """Return the first tag ID of every page when listing tags by ID."""
+    connection = Tortoise.get_connection("default")
+    _, rows = await connection.execute_query(
+        'SELECT "tag_id" FROM ('
+        'SELECT "tag_id", ROW_NUMBER() OVER (ORDER BY "tag_id") AS "n" FROM "tag"'
+        f') AS "numbered" WHERE ("n" - 1) % {int(page_size)} = 0 ORDER BY "tag_id"'
+    )
+    return [row[0] for row in rows]
@@ -0,0 +1,105 @@
+import time
+
+from tortoise.transactions import in_transaction
+
+from .models import Game24Stats
+
+
+class SolveStats:
+    """Stats gathered for one player in one guild since the last flush."""
+
+    __slots__ = ("solves", "total_time", "best_time", "best_streak")
+
+    def __init__(self, solves=0, total_time=0.0, best_time=None, best_streak=0):
+        self.solves = solves
+        self.total_time = total_time
+        self.best_time = best_time
+        self.best_streak = best_streak
+
+    @classmethod
+    def solve(cls, elapsed: float, streak: int) -> "SolveStats":
+        return cls(1, elapsed, elapsed, streak)
+
+    def merge(self, other: "SolveStats") -> "SolveStats":
+        best_times = [t for t in (self.best_time, other.best_time) if t is not None]
+        return SolveStats(
+            self.solves + other.solves,
+            self.total_time + other.total_time,
+            min(best_times, default=None),
+            max(self.best_streak, other.best_streak),
+        )
+
+
+async def save_stats(batch: dict[tuple[int, int], SolveStats]):
+    """Add buffered stats, keyed by (guild ID, user ID), to the stored totals."""
+    async with in_transaction() as connection:
+        existing = {
+            (row.guild_id, row.user_id): row
+            for row in await Game24Stats.filter(
+                guild_id__in={guild_id for guild_id, _ in batch},
+                user_id__in={user_id for _, user_id in batch},
+            ).using_db(connection)
+        }
+
+        created = []
+        for (guild_id, user_id), stats in batch.items():
+            row = existing.get((guild_id, user_id))
+            if row is None:
+                created.append(
+                    Game24Stats(
+                        guild_id=guild_id,
+                        user_id=user_id,
+                        solves=stats.solves,
+                        total_time=stats.total_time,
+                        best_time=stats.best_time,
+                        best_streak=stats.best_streak,
+                    )
+                )
+                continue
+            merged = SolveStats(
+                row.solves, row.total_time, row.best_time, row.best_streak
+            ).merge(stats)
+            row.solves = merged.solves
+            row.total_time = merged.total_time
+            row.best_time = merged.best_time
+            row.best_streak = merged.best_streak
+
+        updated = [row for key, row in existing.items() if key in batch]
+        if updated:
+            await Game24Stats.bulk_update(
+                updated,
+                fields=["solves", "total_time", "best_time", "best_streak"],
+                using_db=connection,
+            )
+        if created:
+            await Game24Stats.bulk_create(created, using_db=connection)
+
+
+class Leaderboard:
+    """Per-guild stats, read from the database at most once every `ttl` seconds."""
+
+    ORDERINGS = {
+        "solves": lambda row: -row["solves"],
+        "best": lambda row: row["best_time"],
+        "average": lambda row: row["total_time"] / row["solves"],
+        "streak": lambda row: -row["best_streak"],
+    }
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._cache: dict[int, tuple[float, list[dict]]] = {}
+
+    async def rows(self, guild_id: int) -> list[dict]:
+        cached = self._cache.get(guild_id)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl:
+            return cached[1]
+
+        rows = await Game24Stats.filter(guild_id=guild_id, solves__gt=0).values(
+            "user_id", "solves", "total_time", "best_time", "best_streak"
+        )
+        self._cache[guild_id] = (time.monotonic(), rows)
+        return rows
+
+    async def top(self, guild_id: int, by: str = "solves", limit: int = 10):
+        rows = await self.rows(guild_id)
+        return sorted(rows, key=self.ORDERINGS[by])[:limit]
@@ -0,0 +1,12 @@
+import discord
+
+# gateway intents each cog in `unity.cogs` needs, by module name. They are
+# kept here rather than in the cog modules so the bot can pick its intents
+# before the cogs are loaded, without running any cog module twice. Cogs not
+# listed only use slash commands and need none.
+COG_INTENTS = {
+    # tag triggers are matched against the content of every message
+    "tags": discord.Intents(messages=True, message_content=True),
+    # answers are read from the messages in a game's channel
+    "game24": discord.Intents(messages=True, message_content=True),
+}
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import multiprocessing
+
+logger = logging.getLogger(__name__)
+
+
+# generous budget for starting the worker and importing what it runs
+STARTUP_TIMEOUT = 30
+
+
+class WorkerError(Exception):
+    """The worker process died during a call."""
+
+
+def _serve(conn, initializer, initargs):
+    # runs in the worker process, one call at a time
+    if initializer is not None:
+        initializer(*initargs)
+    conn.send("ready")
+    while True:
+        try:
+            func, args = conn.recv()
+        except EOFError:
+            return
+        try:
+            conn.send((True, func(*args)))
+        except Exception as e:
+            conn.send((False, e))
+
+
+async def poll(conn, timeout: float) -> bool:
+    """Wait until a connection has data to read, without blocking the loop."""
+    if conn.poll():
+        return True
+    loop = asyncio.get_running_loop()
+    readable = loop.create_future()
+    try:
+        loop.add_reader(
+            conn.fileno(), lambda: readable.done() or readable.set_result(None)
+        )
+    except NotImplementedError:
+        # event loops without reader support (e.g. Windows proactor)
+        return await asyncio.to_thread(conn.poll, timeout)
+    try:
+        await asyncio.wait_for(readable, timeout)
+        return True
+    except TimeoutError:
+        return False
+    finally:
+        loop.remove_reader(conn.fileno())
+
+
+class CallWorker:
+    """Runs function calls in a separate process that is killed when it overruns.
+
+    Calls are made one at a time. The process is started on first use and
+    restarted after being killed, so an abandoned call does not hold up the
+    ones after it. Functions and arguments must be picklable; `initializer`
+    is called with `initargs` in every new process before its first call.
+    """
+
+    def __init__(self, name: str = "unity-worker", initializer=None, initargs=()):
+        self.name = name
+        self.initializer = initializer
+        self.initargs = initargs
+        self._context = multiprocessing.get_context("spawn")
+        self._process = None
+        self._conn = None
+        self._lock = asyncio.Lock()
+
+    async def call(self, func, *args, timeout: float):
+        """Return `func(*args)`, or raise TimeoutError and kill the process.
+
+        Raises WorkerError if the process dies; the next call starts a new one.
+        """
+        async with self._lock:
+            return await self._call(func, args, timeout)
+
+    async def _call(self, func, args, timeout):
+        # callers hold `_lock`
+        if self._process is None or not self._process.is_alive():
+            await self._start()
+        try:
+            self._conn.send((func, args))
+            await self._receive(timeout)
+            ok, value = self._conn.recv()
+        except TimeoutError:
+            # an OSError too, but the process was killed on purpose
+            raise
+        except (EOFError, OSError) as e:
+            self.close()
+            raise WorkerError(f"Worker process {self.name} died.") from e
+        if not ok:
+            raise value
+        return value
+
+    async def _receive(self, timeout):
+        if not await poll(self._conn, timeout):
+            self.close()
+            raise TimeoutError()
+
+    async def _start(self):
+        self._conn, child = self._context.Pipe()
+        self._process = self._context.Process(
+            target=_serve,
+            args=(child, self.initializer, self.initargs),
+            name=self.name,
+            daemon=True,
+        )
+        self._process.start()
+        child.close()
+        await self._receive(STARTUP_TIMEOUT)
+        self._conn.recv()
+        logger.debug(f"Started worker process {self._process.pid} ({self.name}).")
+
+    def close(self):
+        if self._process is None:
+            return
+        self._process.kill()
+        self._process.join()
+        self._conn.close()
+        logger.debug(f"Stopped worker process {self._process.pid} ({self.name}).")
+        self._process = None
+        self._conn = None
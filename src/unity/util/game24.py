@@ -0,0 +1,221 @@
+import logging
+import sys
+from fractions import Fraction
+from pathlib import Path
+
+from .solver import Solver
+
+logger = logging.getLogger(__name__)
+
+
+# answers longer or more deeply nested than this are rejected before parsing
+MAX_EXPRESSION_LENGTH = 200
+MAX_DEPTH = 16
+MAX_NUMBER_DIGITS = 6
+
+PRECEDENCE = {"+": 1, "-": 1, "*": 2, "/": 2}
+
+
+def tokenize(text):
+    """Split an expression into numbers, operators and parentheses in one pass.
+
+    Returns the flat token list and the numbers used, or None if the text is
+    too long, nested too deeply, unbalanced or contains anything else.
+    """
+    if len(text) > MAX_EXPRESSION_LENGTH:
+        return None
+
+    tokens = []
+    nums = []
+    depth = 0
+    i = 0
+    n = len(text)
+    while i < n:
+        char = text[i]
+        if "0" <= char <= "9":
+            j = i + 1
+            while j < n and "0" <= text[j] <= "9":
+                j += 1
+            if j - i > MAX_NUMBER_DIGITS:
+                return None
+            num = int(text[i:j])
+            tokens.append(num)
+            nums.append(num)
+            i = j
+            continue
+        if char in "+-*/":
+            tokens.append(char)
+        elif char == "(":
+            depth += 1
+            if depth > MAX_DEPTH:
+                return None
+            tokens.append(char)
+        elif char == ")":
+            depth -= 1
+            if depth < 0:
+                return None
+            tokens.append(char)
+        elif char != " ":
+            return None
+        i += 1
+
+    if depth:
+        return None
+    return tokens, nums
+
+
+def apply(op, a, b):
+    if op == "+":
+        return a + b
+    if op == "-":
+        return a - b
+    if op == "*":
+        return a * b
+    if not b:
+        raise ZeroDivisionError("division by zero")
+    return Fraction(a, b)
+
+
+def evaluate(tokens):
+    """Evaluate a token list from `tokenize` with exact arithmetic.
+
+    The notation is picked from the tokens: an expression starting with an
+    operator is prefix, one ending with an operator is postfix, anything else
+    is infix. Parentheses only group in infix; in prefix and postfix they are
+    redundant and ignored. Returns None for malformed expressions and division
+    by zero. Integers only become fractions once something is divided.
+    """
+    operands = [token for token in tokens if token != "(" and token != ")"]
+    if not operands:
+        return None
+    try:
+        if isinstance(operands[0], str):
+            return _evaluate_prefix(operands)
+        if isinstance(operands[-1], str):
+            return _evaluate_postfix(operands)
+        return _evaluate_infix(tokens)
+    except (ZeroDivisionError, IndexError):
+        return None
+
+
+def _evaluate_prefix(tokens):
+    stack = []
+    for token in reversed(tokens):
+        if isinstance(token, int):
+            stack.append(token)
+        else:
+            a = stack.pop()
+            stack.append(apply(token, a, stack.pop()))
+    return stack[0] if len(stack) == 1 else None
+
+
+def _evaluate_postfix(tokens):
+    stack = []
+    for token in tokens:
+        if isinstance(token, int):
+            stack.append(token)
+        else:
+            b = stack.pop()
+            stack.append(apply(token, stack.pop(), b))
+    return stack[0] if len(stack) == 1 else None
+
+
+def _evaluate_infix(tokens):
+    values = []
+    ops = []
+
+    def reduce():
+        b = values.pop()
+        values.append(apply(ops.pop(), values.pop(), b))
+
+    expect_operand = True
+    for token in tokens:
+        if isinstance(token, int):
+            if not expect_operand:
+                return None
+            values.append(token)
+            expect_operand = False
+        elif token == "(":
+            if not expect_operand:
+                return None
+            ops.append(token)
+        elif token == ")":
+            if expect_operand:
+                return None
+            while ops[-1] != "(":
+                reduce()
+            ops.pop()
+        else:
+            if expect_operand:
+                return None
+            while ops and ops[-1] != "(" and PRECEDENCE[ops[-1]] >= PRECEDENCE[token]:
+                reduce()
+            ops.append(token)
+            expect_operand = True
+
+    if expect_operand:
+        return None
+    while ops:
+        reduce()
+    return values[0]
+
+
+def check_answer(text, nums, target=24):
+    """Check that an answer uses exactly the given numbers and hits the target."""
+    parsed = tokenize(text)
+    if parsed is None:
+        return False
+    tokens, used = parsed
+    if sorted(used) != sorted(nums):
+        return False
+    return evaluate(tokens) == target
+
+
+def solutions_path(puzzles_path) -> Path:
+    puzzles_path = Path(puzzles_path)
+    return puzzles_path.with_name(puzzles_path.stem + ".solutions.txt")
+
+
+def build_solution_table(puzzles_path, target=24) -> int:
+    """Solve every hand in a puzzle file and write the solutions file next to it.
+
+    Each line holds the sorted hand, the number of distinct solutions and
+    every one of them, separated by tabs. Solutions are distinct up to
+    swapping the operands of `+` and `*` and swapping equal numbers, as given
+    by `Solver.solutions`.
+    """
+    with open(puzzles_path) as f:
+        hands = [tuple(sorted(map(int, line.split()))) for line in f if line.strip()]
+
+    with open(solutions_path(puzzles_path), "w") as f:
+        for hand in hands:
+            solutions = list(Solver(hand).solutions(target))
+            f.write(
+                "\t".join([" ".join(map(str, hand)), str(len(solutions)), *solutions])
+            )
+            f.write("\n")
+    return len(hands)
+
+
+def load_solution_table(
+    puzzles_path,
+) -> dict[tuple[int, ...], tuple[int, tuple[str, ...]]]:
+    """Load the solutions file for a puzzle file, keyed by sorted hand.
+
+    Each hand maps to its number of distinct solutions and the solutions.
+    """
+    table = {}
+    with open(solutions_path(puzzles_path)) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            hand, count, *solutions = line.rstrip("\n").split("\t")
+            table[tuple(map(int, hand.split()))] = (int(count), tuple(solutions))
+    return table
+
+
+if __name__ == "__main__":
+    # python -m unity.util.game24 data/game24/4d12.txt
+    for path in sys.argv[1:]:
+        count = build_solution_table(path)
+        print(f"Wrote {count} solved hands to {solutions_path(path)}.")
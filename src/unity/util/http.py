@@ -0,0 +1,46 @@
+import logging
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+# connection pool tuning for the handful of APIs the bot talks to
+CONNECTION_LIMIT = 20
+CONNECTION_LIMIT_PER_HOST = 8
+KEEPALIVE_TIMEOUT = 60
+DNS_CACHE_TTL = 300
+TIMEOUT = aiohttp.ClientTimeout(total=15, connect=5, sock_read=10)
+
+
+class SharedSession:
+    """One long-lived `aiohttp.ClientSession` shared by everything in a cog.
+
+    The session is created on first use, inside the running event loop, and
+    recreated if it has been closed. Connections are kept alive and DNS
+    lookups cached between requests.
+    """
+
+    def __init__(self, **options):
+        self.options = options
+        self._session: aiohttp.ClientSession | None = None
+
+    def get(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=CONNECTION_LIMIT,
+                limit_per_host=CONNECTION_LIMIT_PER_HOST,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=DNS_CACHE_TTL,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=TIMEOUT, **self.options
+            )
+            logger.debug("Opened a shared HTTP session.")
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.debug("Closed the shared HTTP session.")
+        self._session = None
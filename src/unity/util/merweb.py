@@ -1,25 +1,29 @@
 import re
+from functools import lru_cache
 
-import aiohttp
+from .http import SharedSession
 
 ICON = "https://dictionaryapi.com/images/info/branding-guidelines/MWLogo_DarkBG_120x120_2x.png"
 
 
 class MerWebWrapper:
-    def __init__(self, base_url: str, api_key: str = None):
+    def __init__(
+        self, base_url: str, api_key: str = None, session: SharedSession = None
+    ):
         self.base_url = base_url
         self.api_key = api_key
+        # wrappers built from the same session share its connection pool
+        self.session = session or SharedSession()
 
     async def fetch(self, word: str):
         url = f"{self.base_url}/{word.replace(' ', '%20')}"
         if self.api_key:
             url += f"?key={self.api_key}"
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    raise Exception(f"Error fetching data: {response.status}")
-                return await response.json()
+        async with self.session.get().get(url) as response:
+            if response.status != 200:
+                raise Exception(f"Error fetching data: {response.status}")
+            return await response.json()
 
 
 def mw_dict_link(hw: str) -> str:
@@ -63,7 +67,8 @@ processing_map = {
 }
 
 
-def processed(text: str) -> str:
+def processed_sequential(text: str) -> str:
+    """Reference renderer: one `re.sub` per entry of `processing_map`, in order."""
     if not text:
         return text
 
@@ -72,3 +77,139 @@ def processed(text: str) -> str:
         text = re.sub(pattern, repl, text)
 
     return text
+
+
+# single-pass renderer; it reproduces `processed_sequential` exactly and hands
+# any line it cannot be sure about back to it
+
+# tag pair -> (text for the opening tag, text for the closing tag)
+PAIRED_TAGS = {
+    "b": ("**", "**"),
+    "inf": ("", ""),
+    "it": ("*", "*"),
+    "sup": ("", ""),
+    "gloss": ("[", "]"),
+    "phrase": ("***", "***"),
+    "qword": ("*", "*"),
+    "wi": ("*", "*"),
+    "dx": ("—", ""),
+    "dx_def": ("—", ""),
+    "dx_ety": ("—", ""),
+    "ma": ("—more at ", ""),
+}
+
+# these uppercase their contents partway through the sequential passes, which
+# also hides any tags inside that have not been rendered yet; only pairs around
+# plain text are rendered here
+UPPERCASE_TAGS = ["{sc}", "{parahw}"]
+PLAIN_UPPERCASE = re.compile(r"\{(sc|parahw)\}([^{}]*)\{/\1\}")
+
+
+def _uppercase(match: re.Match) -> str:
+    if match.group(1) == "sc":
+        return match.group(2).upper()
+    return "**" + match.group(2).upper() + "**"
+
+EMPTY_TAGS = {"bc": ": ", "ldquo": "“", "rdquo": "”"}
+
+# tag -> (minimum number of fields, whether the first field ends at a colon)
+LINK_TAGS = {
+    "a_link": (1, False),
+    "d_link": (2, False),
+    "i_link": (2, False),
+    "et_link": (2, False),
+    "mat": (2, True),
+    "sx": (3, False),
+    "dxt": (3, True),
+    "ds": (3, False),
+}
+
+TOKEN = re.compile(r"\{([^{}]*)\}")
+
+OPEN, CLOSE, TEXT, FALLBACK = range(4)
+
+
+@lru_cache(maxsize=4096)
+def _classify(body: str) -> tuple[int, str | None, str | None]:
+    """Return (kind, tag pair name, output) for the body of a `{...}` token."""
+    if body[:1] == "/":
+        if body[1:] in PAIRED_TAGS:
+            return CLOSE, body[1:], PAIRED_TAGS[body[1:]][1]
+        return TEXT, None, "{" + body + "}"
+    if body in PAIRED_TAGS:
+        return OPEN, body, PAIRED_TAGS[body][0]
+    if body in EMPTY_TAGS:
+        return TEXT, None, EMPTY_TAGS[body]
+
+    name, bar, rest = body.partition("|")
+    if name not in LINK_TAGS:
+        return TEXT, None, "{" + body + "}"
+    fields, colon = LINK_TAGS[name]
+    if not bar or rest.count("|") + 1 < fields:
+        # the sequential patterns would keep looking past this token
+        return FALLBACK, None, None
+    if name == "ds":
+        return TEXT, None, ""
+    if name == "a_link":
+        return TEXT, None, mw_dict_link(rest)
+    target = rest.split("|", 1)[0]
+    if colon:
+        target = target.split(":", 1)[0]
+    return TEXT, None, mw_dict_link(target)
+
+
+def _render_line(line: str) -> str | None:
+    """Render one line, or return None if it needs the sequential renderer."""
+    if "{sc}" in line or "{parahw}" in line:
+        line = PLAIN_UPPERCASE.sub(_uppercase, line)
+        for tag in UPPERCASE_TAGS:
+            if tag in line:
+                return None
+
+    parts = TOKEN.split(line)
+    # every brace has to belong to a token
+    if line.count("{") != len(parts) // 2:
+        return None
+
+    # like the non-greedy patterns, an opening tag pairs with the next closing
+    # tag of the same name, and tags that do not pair up are left as they are
+    pending = {}
+    for i in range(1, len(parts), 2):
+        kind, name, output = _classify(parts[i])
+        if kind == TEXT:
+            parts[i] = output
+        elif kind == OPEN:
+            if name in pending:
+                parts[i] = "{" + name + "}"
+            else:
+                pending[name] = (i, output)
+        elif kind == CLOSE:
+            if name in pending:
+                j, opening = pending.pop(name)
+                parts[j] = opening
+                parts[i] = output
+            else:
+                parts[i] = "{/" + name + "}"
+        else:
+            return None
+    for name, (j, _) in pending.items():
+        parts[j] = "{" + name + "}"
+    return "".join(parts)
+
+
+def processed(text: str) -> str:
+    """Render Merriam-Webster markup in one pass over the text.
+
+    None of the patterns in `processing_map` can span a line break, so each
+    line is rendered on its own. The few lines with markup inside {sc} or
+    {parahw}, or with malformed links, go through `processed_sequential`.
+    """
+    if not text or "{" not in text:
+        return text
+
+    lines = text.split("\n")
+    for i, line in enumerate(lines):
+        if "{" in line:
+            rendered = _render_line(line)
+            lines[i] = processed_sequential(line) if rendered is None else rendered
+    return "\n".join(lines)
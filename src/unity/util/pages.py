@@ -0,0 +1,70 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+import discord
+from discord.ext.pages import Page, Paginator
+
+logger = logging.getLogger(__name__)
+
+
+class LazyPaginator(Paginator):
+    """Paginator that renders each page only when it is navigated to.
+
+    `render` is awaited with a zero-based page number. Rendered pages within
+    `window` pages of the current one are kept, anything further away is
+    dropped and rendered again if the user comes back to it.
+    """
+
+    def __init__(
+        self,
+        page_count: int,
+        render: Callable[[int], Awaitable[Page]],
+        *,
+        window: int = 2,
+        **options,
+    ):
+        super().__init__(pages=["…"] * max(page_count, 1), **options)
+        self.render = render
+        self.window = window
+        self.rendered: set[int] = set()
+
+    async def load_page(self, page_number: int):
+        if page_number not in self.rendered:
+            self.pages[page_number] = await self.render(page_number)
+            self.rendered.add(page_number)
+            logger.debug(f"Rendered page {page_number + 1}/{self.page_count + 1}.")
+
+        # forget pages outside the cached window around the current one
+        for other in list(self.rendered):
+            if abs(other - page_number) > self.window:
+                self.pages[other] = "…"
+                self.rendered.discard(other)
+
+    async def goto_page(
+        self, page_number: int = 0, *, interaction: discord.Interaction | None = None
+    ) -> None:
+        await self.load_page(page_number)
+        await super().goto_page(page_number, interaction=interaction)
+
+    async def respond(self, interaction, *args, **kwargs):
+        await self.load_page(self.current_page)
+        return await super().respond(interaction, *args, **kwargs)
+
+
+class StreamingPaginator(Paginator):
+    """Paginator whose pages are filled in while it is already shown.
+
+    Every page starts out as a placeholder. `set_page` swaps in the finished
+    page and, if that page is the one on screen, edits the message to show it.
+    """
+
+    def __init__(self, placeholders: list[Page | str], **options):
+        super().__init__(pages=list(placeholders), **options)
+        self.lock = asyncio.Lock()
+
+    async def set_page(self, page_number: int, page: Page | str):
+        async with self.lock:
+            self.pages[page_number] = page
+            if self.message is not None and page_number == self.current_page:
+                await self.goto_page(page_number)
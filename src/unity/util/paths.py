@@ -0,0 +1,8 @@
+import os
+from pathlib import Path
+
+# the data/ directory next to src/, so files are found from any working
+# directory; UNITY_DATA_DIR points somewhere else, e.g. for an installed package
+DATA_DIR = Path(
+    os.getenv("UNITY_DATA_DIR", Path(__file__).resolve().parents[3] / "data")
+)
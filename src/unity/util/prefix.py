@@ -0,0 +1,49 @@
+from bisect import bisect_left, insort
+
+
+class PrefixIndex:
+    """Case-insensitive prefix search over a sorted array of words.
+
+    Words are kept sorted by their folded form, so every word starting with
+    a prefix sits in one contiguous run found with a binary search.
+    """
+
+    def __init__(self, words=()):
+        self._keys: list[str] = []
+        self._words: dict[str, str] = {}
+        self.update(words)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, word: str):
+        return word.casefold() in self._words
+
+    def add(self, word: str):
+        self.update([word])
+
+    def update(self, words):
+        new = {}
+        for word in words:
+            word = " ".join(word.split())
+            key = word.casefold()
+            if key and key not in self._words:
+                new.setdefault(key, word)
+        self._words.update(new)
+        if len(new) < 64:
+            for key in new:
+                insort(self._keys, key)
+        else:
+            # one sort beats many insertions for bulk loads
+            self._keys = sorted(self._words)
+
+    def complete(self, prefix: str, limit: int = 25) -> list[str]:
+        """Return up to `limit` words starting with `prefix` in sorted order."""
+        key = " ".join(prefix.split()).casefold()
+        matches = []
+        for i in range(bisect_left(self._keys, key), len(self._keys)):
+            candidate = self._keys[i]
+            if not candidate.startswith(key) or len(matches) == limit:
+                break
+            matches.append(self._words[candidate])
+        return matches
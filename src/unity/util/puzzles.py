@@ -0,0 +1,166 @@
+import argparse
+import mmap
+import random
+import struct
+from itertools import combinations_with_replacement
+from pathlib import Path
+
+from .solver import MAX_HAND_SIZE, Solver
+
+# Binary puzzle store layout (little endian):
+#   header   magic b"U24P", version u8, hand size u8, target u16
+#   index    record number where each difficulty level starts, plus the total,
+#            as len(LEVELS) + 1 u32 values
+#   records  sorted by level; each is `hand size` u8 numbers (sorted), the
+#            solution count as u16 (saturating) and the level as u8
+MAGIC = b"U24P"
+VERSION = 1
+HEADER = struct.Struct("<4sBBH")
+
+LEVELS = ["easy", "medium", "hard", "fractions"]
+
+
+def analyze(hand, target=24) -> tuple[int, bool]:
+    """Return the number of solutions of a hand and whether it needs fractions.
+
+    Solutions are counted as the distinct expressions `Solver.solutions`
+    gives, the same count as the solutions table. A hand needs fractions when
+    none of its solutions keeps every partial result a whole number.
+    """
+    count = sum(1 for _ in Solver(hand).solutions(target))
+    return count, count > 0 and not Solver(hand, integral=True).can_reach(target)
+
+
+def build_store(hands, target=24) -> bytes:
+    """Analyze hands of the same size and pack the solvable ones into a store.
+
+    Hands that can only be solved through a fraction get the hardest level.
+    The rest are split on the quartiles of their solution counts: the least
+    solvable quarter is hard, the middle half medium and the rest easy.
+    """
+    analyzed = []
+    for hand in hands:
+        hand = tuple(sorted(hand))
+        count, fractions = analyze(hand, target)
+        if count:
+            analyzed.append((hand, count, fractions))
+    if not analyzed:
+        raise ValueError("None of the hands can be solved.")
+
+    counts = sorted(count for _, count, fractions in analyzed if not fractions)
+    hard = counts[len(counts) // 4] if counts else 0
+    medium = counts[len(counts) * 3 // 4] if counts else 0
+
+    records = []
+    for hand, count, fractions in analyzed:
+        if fractions:
+            level = "fractions"
+        elif count <= hard:
+            level = "hard"
+        elif count <= medium:
+            level = "medium"
+        else:
+            level = "easy"
+        records.append((LEVELS.index(level), hand, min(count, 0xFFFF)))
+    records.sort()
+
+    size = len(records[0][1])
+    record = struct.Struct(f"<{size}BHB")
+    index = [0] * (len(LEVELS) + 1)
+    for level, _, _ in records:
+        index[level + 1] += 1
+    for level in range(len(LEVELS)):
+        index[level + 1] += index[level]
+
+    return b"".join(
+        [
+            HEADER.pack(MAGIC, VERSION, size, target),
+            struct.pack(f"<{len(index)}I", *index),
+            *(record.pack(*hand, count, level) for level, hand, count in records),
+        ]
+    )
+
+
+def generate_hands(size: int, high: int, low: int = 1):
+    return combinations_with_replacement(range(low, high + 1), size)
+
+
+class PuzzleStore:
+    """Read-only view over a packed puzzle store, usually memory mapped."""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        magic, version, self.size, self.target = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a puzzle store or unsupported version.")
+
+        index_offset = HEADER.size
+        self.index = struct.unpack_from(f"<{len(LEVELS) + 1}I", buffer, index_offset)
+        self.record = struct.Struct(f"<{self.size}BHB")
+        self.records_offset = index_offset + 4 * len(self.index)
+        self._mmap = None
+
+    @classmethod
+    def open(cls, path) -> "PuzzleStore":
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        store = cls(mapped)
+        store._mmap = mapped
+        return store
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __len__(self):
+        return self.index[-1]
+
+    def count(self, level: str | None = None) -> int:
+        if level is None:
+            return len(self)
+        i = LEVELS.index(level)
+        return self.index[i + 1] - self.index[i]
+
+    def __getitem__(self, i) -> tuple[tuple[int, ...], int, str]:
+        """Return the sorted hand, solution count and level of record `i`."""
+        *hand, count, level = self.record.unpack_from(
+            self.buffer, self.records_offset + i * self.record.size
+        )
+        return tuple(hand), count, LEVELS[level]
+
+    def sample(self, level: str | None = None) -> tuple[int, ...]:
+        """Pick a random hand in random order, optionally of a given level."""
+        if level is None:
+            start, stop = 0, len(self)
+        else:
+            i = LEVELS.index(level)
+            start, stop = self.index[i], self.index[i + 1]
+        if start == stop:
+            raise LookupError(f"No puzzles of level {level!r}.")
+        hand, _, _ = self[random.randrange(start, stop)]
+        return tuple(random.sample(hand, len(hand)))
+
+
+if __name__ == "__main__":
+    # python -m unity.util.puzzles data/game24/4d12.bin --size 4 --high 12
+    parser = argparse.ArgumentParser(description="Generate a packed puzzle store.")
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--size", type=int, default=4, help="numbers per hand")
+    parser.add_argument("--low", type=int, default=1, help="smallest number")
+    parser.add_argument("--high", type=int, default=12, help="largest number")
+    parser.add_argument("--target", type=int, default=24)
+    args = parser.parse_args()
+    # numbers are stored as single bytes
+    if not 0 <= args.low <= args.high <= 255:
+        parser.error("numbers must satisfy 0 <= --low <= --high <= 255")
+    if not 1 <= args.size <= MAX_HAND_SIZE:
+        parser.error(f"--size must be between 1 and {MAX_HAND_SIZE}")
+    if not 0 <= args.target <= 0xFFFF:
+        parser.error("--target must be between 0 and 65535")
+
+    data = build_store(generate_hands(args.size, args.high, args.low), args.target)
+    args.output.write_bytes(data)
+    store = PuzzleStore(data)
+    levels = ", ".join(f"{store.count(level)} {level}" for level in LEVELS)
+    print(f"Wrote {len(store)} puzzles to {args.output} ({levels}).")
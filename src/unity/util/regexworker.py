@@ -0,0 +1,103 @@
+import logging
+import multiprocessing
+import re
+
+from .callworker import STARTUP_TIMEOUT, CallWorker, WorkerError
+
+logger = logging.getLogger(__name__)
+
+
+class RegexTimeout(Exception):
+    """A pattern ran past its time budget and the worker was killed."""
+
+    def __init__(self, key: int | None):
+        super().__init__(f"Pattern {key} exceeded its time budget.")
+        self.key = key
+
+
+# state of the worker process; `_current` tells the parent which pattern was
+# being evaluated if it has to kill us
+_current = None
+_flags = 0
+_patterns = {}
+
+
+def _init(current, flags):
+    global _current, _flags
+    _current, _flags = current, flags
+
+
+def _set_patterns(sources):
+    global _patterns
+    _patterns = {key: re.compile(source, _flags) for key, source in sources.items()}
+
+
+def _first_match(content, keys):
+    for key in keys:
+        # the parent may have dropped patterns since the keys were chosen
+        pattern = _patterns.get(key)
+        if pattern is None:
+            continue
+        _current.value = key
+        if pattern.fullmatch(content):
+            return key
+    return None
+
+
+def _probe(source, samples):
+    pattern = re.compile(source, _flags)
+    for sample in samples:
+        pattern.fullmatch(sample)
+    return True
+
+
+class RegexWorker(CallWorker):
+    """Evaluates regexes in a separate process that is killed when it overruns.
+
+    The pattern set is kept here and sent again to every new process.
+    """
+
+    def __init__(self, flags: int = 0):
+        self._current = multiprocessing.get_context("spawn").Value("q", 0, lock=False)
+        super().__init__("unity-regex-worker", _init, (self._current, flags))
+        self.flags = flags
+        self.patterns: dict[int, str] = {}
+        self._synced = False
+
+    def set_patterns(self, patterns: dict[int, str]):
+        self.patterns = dict(patterns)
+        self._synced = False
+
+    async def first_match(
+        self, content: str, keys: list[int], timeout: float
+    ) -> int | None:
+        """Return the first key whose pattern fully matches the content."""
+        try:
+            return await self._request(_first_match, (content, keys), timeout)
+        except WorkerError as e:
+            logger.warning(f"Regex worker died while matching, restarting it: {e}")
+            return None
+
+    async def probe(self, source: str, samples: list[str], timeout: float) -> bool:
+        """Check that a pattern gets through the samples within the budget."""
+        try:
+            return await self._request(_probe, (source, samples), timeout)
+        except (RegexTimeout, WorkerError):
+            return False
+
+    async def _request(self, func, args, timeout):
+        async with self._lock:
+            self._current.value = 0
+            try:
+                if self._process is None or not self._process.is_alive():
+                    await self._start()
+                if not self._synced:
+                    await self._call(_set_patterns, (self.patterns,), STARTUP_TIMEOUT)
+                    self._synced = True
+                return await self._call(func, args, timeout)
+            except TimeoutError:
+                raise RegexTimeout(self._current.value or None) from None
+
+    async def _start(self):
+        await super()._start()
+        self._synced = False
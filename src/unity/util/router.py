@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from collections.abc import Callable
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+class ChannelRouter:
+    """Hands each message only to whoever is waiting in its channel.
+
+    Replaces one `bot.wait_for` per waiter, which runs every waiter's check on
+    every message the bot sees. Here a message costs one dict lookup plus the
+    check of the waiter in that channel, if any.
+    """
+
+    def __init__(self):
+        self.waiters: dict[
+            int, tuple[Callable[[discord.Message], bool], asyncio.Future]
+        ] = {}
+
+    def __len__(self):
+        return len(self.waiters)
+
+    def wait_for(
+        self, channel_id: int, check: Callable[[discord.Message], bool]
+    ) -> asyncio.Future:
+        """Return a future for the next message in the channel that passes `check`."""
+        if channel_id in self.waiters:
+            raise RuntimeError(f"Channel {channel_id} already has a waiter.")
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiters[channel_id] = (check, future)
+        future.add_done_callback(lambda _: self._discard(channel_id, future))
+        return future
+
+    def _discard(self, channel_id: int, future: asyncio.Future):
+        waiter = self.waiters.get(channel_id)
+        if waiter is not None and waiter[1] is future:
+            del self.waiters[channel_id]
+
+    def dispatch(self, message: discord.Message) -> bool:
+        waiter = self.waiters.get(message.channel.id)
+        if waiter is None:
+            return False
+
+        check, future = waiter
+        if future.done():
+            return False
+        try:
+            if not check(message):
+                return False
+        except Exception as e:
+            logger.error(
+                f"Message check failed in channel {message.channel.id}.", exc_info=e
+            )
+            return False
+        future.set_result(message)
+        return True
@@ -0,0 +1,37 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one upstream call.
+
+    The first caller for a key starts the call as a task; everyone who asks
+    for the same key while it is running awaits that task and gets the same
+    result or exception. A caller that is cancelled stops waiting without
+    cancelling the shared call, so the others still get their result.
+    """
+
+    def __init__(self):
+        self.calls: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self.calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        # every waiter may have given up, so mark the exception as retrieved
+        if not task.cancelled():
+            task.exception()
+
+    def cancel(self):
+        for task in self.calls.values():
+            task.cancel()
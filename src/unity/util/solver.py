@@ -0,0 +1,222 @@
+import argparse
+from fractions import Fraction
+from itertools import product
+
+# hands larger than this take too long to search exhaustively
+MAX_HAND_SIZE = 6
+
+# keeps `^` from building huge numbers out of already large intermediate values
+MAX_EXPONENT = 10
+MAX_POWER_BASE = 10**6
+
+
+def _power(a, b):
+    if b.denominator != 1 or abs(b) > MAX_EXPONENT or abs(a) > MAX_POWER_BASE:
+        return None
+    if not a and b < 0:
+        return None
+    return a**b.numerator
+
+
+# symbol -> (function, commutative); functions return None when undefined
+OPERATORS = {
+    "+": (lambda a, b: a + b, True),
+    "-": (lambda a, b: a - b, False),
+    "*": (lambda a, b: a * b, True),
+    "/": (lambda a, b: a / b if b else None, False),
+}
+EXTRA_OPERATORS = {
+    "^": (_power, False),
+}
+ALL_OPERATORS = OPERATORS | EXTRA_OPERATORS
+
+DEFAULT_OPERATORS = "".join(OPERATORS)
+
+
+def _format(value: Fraction) -> str:
+    return str(value.numerator) if value.denominator == 1 else str(value)
+
+
+class Solver:
+    """Finds every value reachable from a hand of numbers with exact rationals.
+
+    Each number is used exactly once and any two partial results can be
+    combined, so every bracketing of every ordering is covered. The values
+    reachable from each sub-multiset of the hand are computed once and
+    memoized; equal numbers share their entries so repeated numbers do not
+    repeat work. With `integral`, partial results that are not whole numbers
+    are dropped.
+    """
+
+    def __init__(
+        self, nums, operators: str = DEFAULT_OPERATORS, integral: bool = False
+    ):
+        unknown = set(operators) - set(ALL_OPERATORS)
+        if unknown:
+            raise ValueError(f"Unknown operators: {' '.join(sorted(unknown))}")
+        if not nums:
+            raise ValueError("Need at least one number.")
+        self.nums = tuple(sorted(Fraction(n) for n in nums))
+        self.operators = {symbol: ALL_OPERATORS[symbol] for symbol in operators}
+        self.integral = integral
+        self._reach: dict[tuple[Fraction, ...], set[Fraction]] = {}
+        self._splits: dict[tuple[Fraction, ...], list] = {}
+
+    def splits(self, values: tuple[Fraction, ...]):
+        """Return each way to split a sorted multiset in two, ignoring order."""
+        if values in self._splits:
+            return self._splits[values]
+
+        n = len(values)
+        seen = set()
+        # the first number always goes left, so a split and its mirror image
+        # are only generated once unless equal numbers make them identical
+        for mask in range(1, 1 << (n - 1)):
+            left, right = [values[0]], []
+            for i in range(1, n):
+                (right if mask >> (i - 1) & 1 else left).append(values[i])
+            pair = tuple(left), tuple(right)
+            seen.add(min(pair, pair[::-1]))
+        self._splits[values] = splits = sorted(seen)
+        return splits
+
+    def reachable(self, values: tuple[Fraction, ...] | None = None) -> set[Fraction]:
+        """Return every value an expression over the multiset can take."""
+        if values is None:
+            values = self.nums
+        if values in self._reach:
+            return self._reach[values]
+
+        if len(values) == 1:
+            reach = {values[0]}
+        else:
+            reach = set()
+            for left, right in self.splits(values):
+                left_values, right_values = self.reachable(left), self.reachable(right)
+                for symbol, (func, commutative) in self.operators.items():
+                    for a, b in product(left_values, right_values):
+                        for result in (
+                            (func(a, b),) if commutative else (func(a, b), func(b, a))
+                        ):
+                            if result is not None and (
+                                not self.integral or result.denominator == 1
+                            ):
+                                reach.add(result)
+        self._reach[values] = reach
+        return reach
+
+    def _pairs(self, left, right, target):
+        """Yield (symbol, a, b) with a and b reachable from different sides.
+
+        The basic operators are inverted so only one side has to be scanned;
+        other operators are checked against every pair.
+        """
+        left_values, right_values = self.reachable(left), self.reachable(right)
+        same = left == right
+        for symbol, (func, commutative) in self.operators.items():
+            if symbol not in OPERATORS:
+                for a, b in product(left_values, right_values):
+                    if func(a, b) == target:
+                        yield symbol, (left, a), (right, b)
+                    if not commutative and not same and func(b, a) == target:
+                        yield symbol, (right, b), (left, a)
+                continue
+
+            for a in left_values:
+                for b, swap in _inverse(symbol, a, target, right_values):
+                    # with identical sides, a mirrored pair repeats another
+                    if same and (swap if not commutative else a > b):
+                        continue
+                    if swap:
+                        yield symbol, (right, b), (left, a)
+                    else:
+                        yield symbol, (left, a), (right, b)
+
+    def can_reach(self, target) -> bool:
+        target = Fraction(target)
+        if len(self.nums) == 1:
+            return self.nums[0] == target
+        return any(
+            next(self._pairs(left, right, target), None) is not None
+            for left, right in self.splits(self.nums)
+        )
+
+    def expressions(self, values: tuple[Fraction, ...], target: Fraction):
+        """Yield every distinct expression over the multiset equal to `target`.
+
+        Expressions are distinct up to swapping the operands of `+` and `*`
+        and swapping equal numbers.
+        """
+        if len(values) == 1:
+            if values[0] == target:
+                yield _format(values[0])
+            return
+        for left, right in self.splits(values):
+            for symbol, (a_values, a), (b_values, b) in self._pairs(
+                left, right, target
+            ):
+                for a_expr in self.expressions(a_values, a):
+                    for b_expr in self.expressions(b_values, b):
+                        yield f"({a_expr} {symbol} {b_expr})"
+
+    def solutions(self, target=24):
+        """Yield every distinct expression over the whole hand equal to `target`."""
+        return self.expressions(self.nums, Fraction(target))
+
+
+def _inverse(symbol, a, target, values):
+    """Yield (b, swapped) with b in `values` and `a op b` (or `b op a`) == target."""
+    if symbol == "+":
+        candidates = [(target - a, False)]
+    elif symbol == "-":
+        candidates = [(a - target, False), (a + target, True)]
+    elif symbol == "*":
+        if a:
+            candidates = [(target / a, False)]
+        else:
+            candidates = [(b, False) for b in values] if not target else []
+    else:
+        # a / b == target and b / a == target
+        candidates = []
+        if target:
+            candidates.append((a / target, False))
+        elif not a:
+            candidates.extend((b, False) for b in values if b)
+        if a:
+            candidates.append((target * a, True))
+
+    for b, swap in candidates:
+        if b in values and (symbol != "/" or (a if swap else b)):
+            yield b, swap
+
+
+def solve_hand(nums, target=24, operators: str = DEFAULT_OPERATORS, limit: int = 10):
+    """Return up to `limit` distinct solutions and whether there are more.
+
+    Kept at module level so it can be sent to a worker process.
+    """
+    solutions = []
+    for expression in Solver(nums, operators).solutions(target):
+        if len(solutions) == limit:
+            return solutions, True
+        solutions.append(expression)
+    return solutions, False
+
+
+if __name__ == "__main__":
+    # python -m unity.util.solver 1 3 4 6 --target 24 --operators "+-*/^"
+    parser = argparse.ArgumentParser(description="Solve a hand of the 24 game.")
+    parser.add_argument("nums", type=int, nargs="+")
+    parser.add_argument("--target", type=Fraction, default=24)
+    parser.add_argument("--operators", default=DEFAULT_OPERATORS)
+    parser.add_argument("--all", action="store_true", help="print every solution")
+    args = parser.parse_args()
+
+    solver = Solver(args.nums, args.operators)
+    for i, solution in enumerate(solver.solutions(args.target)):
+        if i and not args.all:
+            break
+        print(solution)
+    else:
+        if not solver.can_reach(args.target):
+            print("No solution.")
@@ -0,0 +1,111 @@
+from itertools import combinations
+
+# deletions are only generated for the start of each word, which keeps the
+# index small while still finding most typos
+PREFIX_LENGTH = 7
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Return the optimal string alignment distance, or `limit + 1` if above it.
+
+    Insertions, deletions, substitutions and swaps of adjacent characters
+    each count as one edit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(
+                previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost
+            )
+            if (
+                previous2 is not None
+                and i > 1
+                and j > 1
+                and a[i - 1] == b[j - 2]
+                and a[i - 2] == b[j - 1]
+            ):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+def deletions(word: str, distance: int) -> set[str]:
+    """Return every string made by deleting up to `distance` characters."""
+    variants = {word}
+    for n in range(1, min(distance, len(word)) + 1):
+        for positions in combinations(range(len(word)), n):
+            variants.add("".join(c for i, c in enumerate(word) if i not in positions))
+    return variants
+
+
+class SpellIndex:
+    """Symmetric-delete spelling index over a set of known words.
+
+    Every word is stored under each variant of its prefix with up to
+    `max_distance` characters deleted. A query looks up its own deletion
+    variants, and the words found are checked with the real edit distance.
+    """
+
+    def __init__(self, words=(), max_distance: int = 2):
+        self.max_distance = max_distance
+        self.words: dict[str, str] = {}
+        self._deletes: dict[str, set[str]] = {}
+        self.update(words)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word: str):
+        return word.casefold() in self.words
+
+    def add(self, word: str):
+        word = " ".join(word.split())
+        key = word.casefold()
+        if not key or key in self.words:
+            return
+        self.words[key] = word
+        for variant in deletions(key[:PREFIX_LENGTH], self.max_distance):
+            self._deletes.setdefault(variant, set()).add(key)
+
+    def update(self, words):
+        for word in words:
+            self.add(word)
+
+    def lookup(self, query: str, max_distance: int | None = None, limit: int = 5):
+        """Return up to `limit` (word, distance) pairs, closest first."""
+        if max_distance is None:
+            max_distance = self.max_distance
+        key = " ".join(query.split()).casefold()
+        if key in self.words:
+            return [(self.words[key], 0)]
+
+        candidates = set()
+        for variant in deletions(key[:PREFIX_LENGTH], max_distance):
+            candidates.update(self._deletes.get(variant, ()))
+
+        matches = []
+        for candidate in candidates:
+            distance = edit_distance(key, candidate, max_distance)
+            if distance <= max_distance:
+                matches.append((distance, abs(len(candidate) - len(key)), candidate))
+        matches.sort()
+        return [(self.words[word], distance) for distance, _, word in matches[:limit]]
+
+    def suggest(self, query: str, limit: int = 5) -> list[str]:
+        """Return likely corrections for a single unknown word.
+
+        Known words, phrases and anything that is not a plain word get no
+        suggestions. Short words allow one edit, longer ones two.
+        """
+        word = query.strip()
+        if not word.replace("-", "").replace("'", "").isalpha() or word in self:
+            return []
+        max_distance = 1 if len(word) <= 4 else self.max_distance
+        return [match for match, _ in self.lookup(word, max_distance, limit)]
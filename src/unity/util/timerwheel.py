@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import math
+from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class Timer:
+    __slots__ = ("callback", "rounds", "cancelled")
+
+    def __init__(self, callback: Callable[[], object], rounds: int):
+        self.callback = callback
+        self.rounds = rounds
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    """Hashed timer wheel driven by a single asyncio task.
+
+    Timers are placed in one of `slots` buckets and fire within `resolution`
+    seconds of their deadline. Delays longer than a full turn of the wheel
+    wait for the right number of rounds. The task only runs while timers are
+    pending.
+    """
+
+    def __init__(self, resolution: float = 1.0, slots: int = 64):
+        self.resolution = resolution
+        self.slots: list[list[Timer]] = [[] for _ in range(slots)]
+        self.position = 0
+        self._task: asyncio.Task | None = None
+
+    def schedule(self, delay: float, callback: Callable[[], object]) -> Timer:
+        """Call `callback` once `delay` seconds have passed, unless cancelled."""
+        ticks = max(1, math.ceil(delay / self.resolution))
+        timer = Timer(callback, (ticks - 1) // len(self.slots))
+        self.slots[(self.position + ticks) % len(self.slots)].append(timer)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return timer
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while any(self.slots):
+            deadline += self.resolution
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            self.position = (self.position + 1) % len(self.slots)
+            self._tick(self.slots[self.position])
+
+    def _tick(self, slot: list[Timer]):
+        due = []
+        remaining = []
+        for timer in slot:
+            if timer.cancelled:
+                continue
+            if timer.rounds:
+                timer.rounds -= 1
+                remaining.append(timer)
+            else:
+                due.append(timer)
+        slot[:] = remaining
+
+        for timer in due:
+            try:
+                timer.callback()
+            except Exception as e:
+                logger.error("Timer callback failed.", exc_info=e)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for slot in self.slots:
+            slot.clear()
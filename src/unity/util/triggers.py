@@ -0,0 +1,239 @@
+import asyncio
+import heapq
+import logging
+import re
+from re import _constants as sre_constants
+from re import _parser as sre_parser
+
+from ..db.models import Tag
+from .regexworker import RegexTimeout, RegexWorker
+
+logger = logging.getLogger(__name__)
+
+
+TRIGGER_FLAGS = re.DOTALL | re.IGNORECASE
+
+# characters that make a trigger more than a plain string
+REGEX_METACHARACTERS = set(".^$*+?{}[]\\|()")
+
+# non-ASCII characters that `re.IGNORECASE` treats as equal to an ASCII letter
+# but that `str.lower` does not map onto it (the Kelvin sign already does)
+ASCII_CASE_FOLD = str.maketrans({"İ": "i", "ı": "i", "ſ": "s"})
+
+# time budgets (in seconds) for regex triggers, enforced by the worker process
+MATCH_TIMEOUT = 0.1
+PROBE_TIMEOUT = 0.5
+PROBE_LENGTH = 64
+
+# number of overruns after which a trigger is disabled
+MAX_STRIKES = 3
+
+
+def compile_trigger(trigger: str) -> re.Pattern:
+    return re.compile(trigger, TRIGGER_FLAGS)
+
+
+def is_literal(trigger: str) -> bool:
+    return trigger.isascii() and not REGEX_METACHARACTERS.intersection(trigger)
+
+
+def fold(text: str) -> str:
+    return text.translate(ASCII_CASE_FOLD).lower()
+
+
+def probe_samples(trigger: str) -> list[str]:
+    """Build inputs likely to make a badly written pattern backtrack."""
+    chars = sorted({c for c in trigger if c.isalnum()} | {"a", "0", " "})[:12]
+    samples = []
+    for c in chars:
+        samples.append(c * PROBE_LENGTH)
+        samples.append(c * PROBE_LENGTH + "\0")
+    samples.append("".join(chars) * (PROBE_LENGTH // len(chars)) + "\0")
+    return samples
+
+
+def literal_prefix(pattern: re.Pattern) -> str:
+    """Return the case-folded literal text every full match must start with."""
+    prefix = []
+    try:
+        for op, arg in sre_parser.parse(pattern.pattern, pattern.flags):
+            # non-ASCII characters can fold in ways `fold` does not mirror
+            if op is not sre_constants.LITERAL or arg > 0x7F:
+                break
+            prefix.append(chr(arg))
+    except re.error:
+        return ""
+    return fold("".join(prefix))
+
+
+class TriggerIndex:
+    """In-memory index of compiled tag triggers, ordered by tag ID.
+
+    Literal triggers are resolved with a case-folded dict lookup. Regex triggers
+    are bucketed by the literal prefix they require, so a message is only tried
+    against the patterns that can possibly match it. The result is always the
+    lowest tag ID whose trigger fully matches, same as trying each tag in order.
+
+    Regex triggers run in a worker process under a time budget; triggers that
+    keep running over it are disabled.
+    """
+
+    def __init__(self):
+        self.entries: dict[int, tuple[re.Pattern, str]] = {}
+        self.loaded = False
+        self.worker = RegexWorker(TRIGGER_FLAGS)
+        self.strikes: dict[int, int] = {}
+        self._lock = asyncio.Lock()
+
+        # derived lookup structures, rebuilt lazily after changes
+        self._dirty = True
+        self._literals: dict[str, list[int]] = {}
+        self._prefixed: dict[str, list[tuple[int, str]]] = {}
+        self._unprefixed: list[int] = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    async def ensure_loaded(self):
+        if self.loaded:
+            return
+        async with self._lock:
+            if not self.loaded:
+                await self._load()
+
+    async def refresh(self):
+        """Reload every trigger from the database."""
+        async with self._lock:
+            await self._load()
+
+    async def _load(self):
+        tags = await Tag.filter(disabled=False).order_by("tag_id")
+        self.entries = {}
+        for tag in tags:
+            self.add(tag)
+        self.loaded = True
+        logger.info(f"Loaded {len(self.entries)} tag trigger(s) into the index.")
+
+    def add(self, tag: Tag) -> bool:
+        try:
+            pattern = compile_trigger(tag.trigger)
+        except re.error as e:
+            logger.warning(f"Skipping tag {tag.tag_id} with invalid trigger: {e}")
+            self.remove(tag.tag_id)
+            return False
+
+        # keep entries in tag ID order so the first match stays the same as a
+        # full table scan would give
+        last = next(reversed(self.entries), None)
+        self.entries[tag.tag_id] = (pattern, tag.response)
+        if last is not None and tag.tag_id < last:
+            self.entries = dict(sorted(self.entries.items()))
+        self._dirty = True
+        return True
+
+    def remove(self, tag_id: int):
+        if self.entries.pop(tag_id, None):
+            self._dirty = True
+
+    def _rebuild(self):
+        literals = {}
+        prefixed = {}
+        unprefixed = []
+        for tag_id, (pattern, _) in self.entries.items():
+            if is_literal(pattern.pattern):
+                literals.setdefault(fold(pattern.pattern), []).append(tag_id)
+            elif prefix := literal_prefix(pattern):
+                prefixed.setdefault(prefix[0], []).append((tag_id, prefix))
+            else:
+                unprefixed.append(tag_id)
+
+        self._literals = literals
+        self._prefixed = prefixed
+        self._unprefixed = unprefixed
+        self._dirty = False
+        self.worker.set_patterns(
+            {
+                tag_id: pattern.pattern
+                for tag_id, (pattern, _) in self.entries.items()
+                if not is_literal(pattern.pattern)
+            }
+        )
+        logger.debug(
+            f"Rebuilt trigger index: {len(literals)} literal key(s), "
+            f"{sum(map(len, prefixed.values()))} prefixed and "
+            f"{len(unprefixed)} unprefixed pattern(s)."
+        )
+
+    async def probe(self, trigger: str) -> bool:
+        """Check that a trigger can be evaluated within the time budget."""
+        if is_literal(trigger):
+            return True
+        return await self.worker.probe(trigger, probe_samples(trigger), PROBE_TIMEOUT)
+
+    async def match_id(self, content: str) -> int | None:
+        """Return the ID of the first tag whose trigger matches the content."""
+        if self._dirty:
+            self._rebuild()
+
+        folded = fold(content)
+        best = None
+        for tag_id in self._literals.get(folded, ()):
+            if self.entries[tag_id][0].fullmatch(content):
+                best = tag_id
+                break
+
+        # only patterns whose required prefix fits the message are tried, in
+        # tag ID order, and only those that could beat a literal match
+        candidates = [
+            tag_id
+            for tag_id in heapq.merge(
+                (
+                    tag_id
+                    for tag_id, prefix in self._prefixed.get(folded[:1], ())
+                    if folded.startswith(prefix)
+                ),
+                self._unprefixed,
+            )
+            if best is None or tag_id < best
+        ]
+        if not candidates:
+            return best
+
+        try:
+            tag_id = await self.worker.first_match(content, candidates, MATCH_TIMEOUT)
+        except RegexTimeout as e:
+            logger.warning(f"Tag trigger matching timed out on tag {e.key}.")
+            if e.key is not None:
+                await self._strike(e.key)
+            tag_id = None
+
+        # tags may have been removed or edited while the worker was matching
+        if tag_id is not None and tag_id in self.entries:
+            return tag_id
+        return best if best in self.entries else None
+
+    async def _strike(self, tag_id: int):
+        if tag_id not in self.entries:
+            # removed while it was being matched
+            self.strikes.pop(tag_id, None)
+            return
+        self.strikes[tag_id] = self.strikes.get(tag_id, 0) + 1
+        if self.strikes[tag_id] < MAX_STRIKES:
+            return
+
+        pattern, _ = self.entries[tag_id]
+        self.remove(tag_id)
+        del self.strikes[tag_id]
+        await Tag.filter(tag_id=tag_id).update(disabled=True)
+        logger.warning(
+            f"Disabled tag {tag_id} after {MAX_STRIKES} timeouts: `{pattern.pattern}`"
+        )
+
+    async def match(self, content: str) -> str | None:
+        """Return the response of the first tag whose trigger matches the content."""
+        tag_id = await self.match_id(content)
+        entry = self.entries.get(tag_id) if tag_id is not None else None
+        return entry[1] if entry is not None else None
+
+    def close(self):
+        self.worker.close()
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """Buffers writes in memory and hands them to `flush` in batches.
+
+    Values put under the same key are combined with `merge` until the next
+    flush, which happens every `interval` seconds or as soon as `batch_size`
+    keys are pending. A failed flush puts its batch back to be retried.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[dict[Hashable, Any]], Awaitable[None]],
+        merge: Callable[[Any, Any], Any],
+        *,
+        interval: float = 30.0,
+        batch_size: int = 200,
+    ):
+        self._flush = flush
+        self.merge = merge
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pending: dict[Hashable, Any] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._closing = False
+        self._lock = asyncio.Lock()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def put(self, key: Hashable, value: Any):
+        if key in self.pending:
+            self.pending[key] = self.merge(self.pending[key], value)
+        else:
+            self.pending[key] = value
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        if len(self.pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self):
+        async with self._lock:
+            if not self.pending:
+                return
+            batch, self.pending = self.pending, {}
+            try:
+                await self._flush(batch)
+                logger.debug(f"Flushed {len(batch)} buffered write(s).")
+            except Exception as e:
+                logger.error(f"Failed to flush {len(batch)} write(s).", exc_info=e)
+                for key, value in batch.items():
+                    if key in self.pending:
+                        self.pending[key] = self.merge(value, self.pending[key])
+                    else:
+                        self.pending[key] = value
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def close(self):
+        """Stop the background task and write out whatever is still pending."""
+        # let a flush in progress finish instead of cancelling it with its
+        # batch already taken out of `pending`
+        self._closing = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()